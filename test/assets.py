@@ -0,0 +1,88 @@
+import os
+from collections import OrderedDict
+
+import pygame
+
+# === Texture asset manager
+# Tileset atlases are shared, reference-counted surfaces keyed by image path.
+# acquire() loads (or reuses) a surface and bumps its count; release() drops it.
+# A surface nobody holds stays cached, so going back to a map is free, but the
+# unused ones are evicted least-recently-released first whenever the total goes
+# over the texture budget. Surfaces still in use are never evicted.
+
+DEFAULT_BUDGET_MB = 32
+
+
+def budget_from_env(default_mb=DEFAULT_BUDGET_MB):
+    # HOC_TEXTURE_BUDGET_MB=16 shrinks the cache, e.g. to test eviction
+    try:
+        return int(float(os.environ.get("HOC_TEXTURE_BUDGET_MB", default_mb)) * 1024 * 1024)
+    except ValueError:
+        return default_mb * 1024 * 1024
+
+
+def surface_bytes(surface):
+    return surface.get_pitch() * surface.get_height()
+
+
+class AssetManager:
+    def __init__(self, budget_bytes=DEFAULT_BUDGET_MB * 1024 * 1024, loader=None):
+        self.budget = budget_bytes
+        self.loader = loader or (lambda path: pygame.image.load(path).convert_alpha())
+        self.surfaces = {}
+        self.refs = {}
+        self.unused = OrderedDict()  # path -> None, oldest release first
+        self.used_bytes = 0
+        self.loads = 0
+        self.evictions = 0
+
+    def acquire(self, path):
+        path = os.path.normpath(path)
+        if path not in self.surfaces:
+            self._store(path, self.loader(path))
+        self.refs[path] = self.refs.get(path, 0) + 1
+        self.unused.pop(path, None)
+        self._evict()
+        return self.surfaces[path]
+
+    def release(self, path):
+        path = os.path.normpath(path)
+        if self.refs.get(path, 0) <= 0:
+            raise KeyError(f"release of unheld asset {path!r}")
+        self.refs[path] -= 1
+        if self.refs[path] == 0:
+            self.unused[path] = None
+            self._evict()
+
+    def reload(self, path):
+        # Replace the cached surface after the file changed on disk; holders re-fetch it
+        path = os.path.normpath(path)
+        if path not in self.surfaces:
+            return None
+        surface = self.loader(path)
+        if path in self.surfaces:
+            self.used_bytes -= surface_bytes(self.surfaces[path])
+        self._store(path, surface)
+        self._evict()
+        return surface
+
+    def _store(self, path, surface):
+        self.surfaces[path] = surface
+        self.used_bytes += surface_bytes(surface)
+        self.loads += 1
+
+    def _evict(self):
+        while self.used_bytes > self.budget and self.unused:
+            path, _ = self.unused.popitem(last=False)
+            self.used_bytes -= surface_bytes(self.surfaces.pop(path))
+            del self.refs[path]
+            self.evictions += 1
+
+    def report(self):
+        lines = [f"Textures: {self.used_bytes / 1024:.0f} KiB of {self.budget / 1024:.0f} KiB budget, "
+                 f"{self.loads} loads, {self.evictions} evictions"]
+        for path, surface in sorted(self.surfaces.items(), key=lambda item: -surface_bytes(item[1])):
+            width, height = surface.get_size()
+            state = f"{self.refs[path]} refs" if self.refs[path] else "unused"
+            lines.append(f"  {surface_bytes(surface) / 1024:8.0f} KiB  {width}x{height}  {state:>7}  {path}")
+        return "\n".join(lines)
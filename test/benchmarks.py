@@ -0,0 +1,528 @@
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+
+from entities import EntityStore, spawn_on_walkable
+from pathfinding import Pathfinder
+from save_system import CHUNK_SIZE, Snapshot, encode_snapshot, pack_chunk, unpack_chunk, write_atomic
+from tilemap import build_collision_grid, load_collidable_gids
+
+# === Headless benchmarks (run from the test/ folder: python benchmarks.py [name ...])
+
+MAP_FOLDER = "map"
+MAP_FILE = os.path.join(MAP_FOLDER, "test.tmj")
+
+
+def load_map():
+    with open(MAP_FILE) as f:
+        map_data = json.load(f)
+    collidable_gids = load_collidable_gids(map_data, MAP_FOLDER)
+    return map_data, collidable_gids
+
+
+def init_display(size=(1280, 768)):
+    # Rendering benchmarks need a display surface; run headless unless told otherwise
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    import pygame
+    pygame.init()
+    return pygame.display.set_mode(size)
+
+
+def timed(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def bench_entities(count=10000, frames=300):
+    map_data, collidable_gids = load_map()
+    grid = build_collision_grid(map_data, collidable_gids)
+    tw, th = map_data["tilewidth"], map_data["tileheight"]
+    rng = np.random.default_rng(1)
+
+    store = EntityStore()
+    spawn_on_walkable(store, rng, grid, tw, th, count, 8, 8)
+    store.wander(rng, 60, 1.0)
+
+    def step():
+        hit = store.integrate(1 / 60, grid, tw, th)
+        store.wander(rng, 60, 0.02, hit)
+
+    ms = timed(step, frames)
+    print(f"entities: {count} moving entities, {ms:.3f} ms/frame (vectorized)")
+
+    # Scalar reference: the same movement and corner test written as a plain Python loop
+    cells = grid.tolist()
+    rows, cols = grid.shape
+    pos = store.pos[:count].tolist()
+    vel = store.vel[:count].tolist()
+
+    def solid(px, py):
+        tx, ty = int(px // tw), int(py // th)
+        return not (0 <= tx < cols and 0 <= ty < rows) or cells[ty][tx]
+
+    def scalar_step():
+        for p, v in zip(pos, vel):
+            x = p[0] + v[0] / 60
+            if not (solid(x, p[1]) or solid(x + 7, p[1]) or solid(x, p[1] + 7) or solid(x + 7, p[1] + 7)):
+                p[0] = x
+            y = p[1] + v[1] / 60
+            if not (solid(p[0], y) or solid(p[0] + 7, y) or solid(p[0], y + 7) or solid(p[0] + 7, y + 7)):
+                p[1] = y
+
+    scalar_ms = timed(scalar_step, 10)
+    print(f"entities: {count} moving entities, {scalar_ms:.3f} ms/frame (scalar Python loop)")
+
+
+def rooms_map(size, seed=0):
+    # Synthetic walkability grid: open field scattered with rectangular obstacles
+    rng = np.random.default_rng(seed)
+    walkable = np.ones((size, size), dtype=bool)
+    for _ in range(size * size // 150):
+        x, y = rng.integers(0, size, 2)
+        w, h = rng.integers(2, 10, 2)
+        walkable[y:y + h, x:x + w] = False
+    return walkable
+
+
+def bench_pathfinding(size=512, agents=300):
+    walkable = rooms_map(size)
+    start = time.perf_counter()
+    pf = Pathfinder(walkable)
+    print(f"pathfinding: {size}x{size} entrances built in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    rng = np.random.default_rng(2)
+    free = np.argwhere(walkable)
+
+    def random_tile():
+        y, x = free[rng.integers(len(free))]
+        return int(x), int(y)
+
+    pairs = [(random_tile(), random_tile()) for _ in range(agents)]
+
+    def replans(label):
+        start = time.perf_counter()
+        for a, b in pairs:
+            pf.find_path(a, b)
+        elapsed = time.perf_counter() - start
+        print(f"pathfinding: {agents} random replans ({label}), {agents / elapsed:.0f} paths/s")
+
+    replans("cold: links built on demand")
+    # The game links clusters in the background after load; same pairs, no cached routes
+    pf = Pathfinder(walkable)
+    start = time.perf_counter()
+    frames = 0
+    while pf.warm_up(2.0):
+        frames += 1
+    print(f"pathfinding: all cluster links built in {(time.perf_counter() - start) * 1000:.0f} ms "
+          f"({frames + 1} frames of warm_up(2 ms))")
+    replans("links prebuilt, no cached routes")
+    replans("warm")
+
+    # A crowd in one region chasing a target that wanders around another region
+    def region(cx, cy, radius):
+        near = free[(abs(free[:, 1] - cx) < radius) & (abs(free[:, 0] - cy) < radius)]
+        return [(int(x), int(y)) for y, x in near]
+
+    crowd = region(100, 100, 40)[:agents]
+    goals = region(400, 400, 6)[:5]
+    start = time.perf_counter()
+    for goal in goals:
+        for a in crowd:
+            pf.find_path(a, goal)
+    elapsed = time.perf_counter() - start
+    print(f"pathfinding: {len(crowd)} agents following one target, {len(goals) * len(crowd) / elapsed:.0f} paths/s")
+
+
+def bench_save(size=512):
+    # Every chunk of a size x size, two-layer world marked dirty: the worst case
+    rng = np.random.default_rng(3)
+    map_data = {"width": size, "height": size, "layers": [
+        {"type": "tilelayer", "data": rng.integers(1, 300, size * size).tolist()},
+        {"type": "tilelayer", "data": (rng.integers(0, 8, size * size) * (rng.random(size * size) < 0.2)).tolist()},
+    ]}
+    chunks_per_side = (size + CHUNK_SIZE - 1) // CHUNK_SIZE
+    keys = [(cx, cy) for cy in range(chunks_per_side) for cx in range(chunks_per_side)]
+
+    start = time.perf_counter()
+    chunks = {key: pack_chunk(map_data, *key) for key in keys}
+    pack_ms = (time.perf_counter() - start) * 1000
+    state = {
+        "player": (100, 200), "track": 1, "solved": {"Old Man Cedric"},
+        "npcs": [("Bugsy the Apprentice", 53, 19, 1)], "chunks": chunks,
+    }
+    start = time.perf_counter()
+    data = encode_snapshot(state)
+    encode_ms = (time.perf_counter() - start) * 1000
+    path = os.path.join("saves", "bench.hoc")
+    start = time.perf_counter()
+    write_atomic(path, data)
+    write_ms = (time.perf_counter() - start) * 1000
+    raw = size * size * 2 * 4
+    print(f"save: {len(keys)} chunks, {len(data) / 1024:.0f} KiB ({len(data) / raw:.1%} of raw gids)")
+    print(f"save: pack {pack_ms:.1f} ms, encode {encode_ms:.1f} ms, atomic write {write_ms:.1f} ms")
+
+    start = time.perf_counter()
+    snapshot = Snapshot.open(path)
+    open_ms = (time.perf_counter() - start) * 1000
+    start = time.perf_counter()
+    for key in keys[:64]:
+        unpack_chunk(map_data, snapshot.chunk_blob(*key), *key)
+    chunk_ms = (time.perf_counter() - start) * 1000 / 64
+    print(f"load: open {open_ms:.2f} ms (core + index only), {chunk_ms:.3f} ms per chunk on demand")
+    os.remove(path)
+
+
+def bench_lighting(frames=200):
+    from lighting import LightingLayer, light_gids
+    from tilemap import parse_tileset, tileset_path
+
+    screen = init_display()
+    map_data, _ = load_map()
+    tilesets = []
+    for ts in map_data["tilesets"]:
+        info = parse_tileset(tileset_path(MAP_FOLDER, ts))
+        tilesets.append({"name": info["name"], "firstgid": ts["firstgid"], "lights": info["lights"]})
+
+    start = time.perf_counter()
+    lighting = LightingLayer(map_data, light_gids(tilesets))
+    bake_ms = (time.perf_counter() - start) * 1000
+    lighting.visited[:] = True
+    lighting.fog.fill((255, 255, 255))
+
+    step = iter(range(10 ** 9))
+
+    def frame():
+        i = next(step) % 400
+        lighting.draw(screen, (200 + i, 150 + i // 2), (900 + i, 500 + i // 2))
+
+    ms = timed(frame, frames)
+    print(f"lighting: {len(lighting.lights)} static lights baked into {len(lighting.chunks)} chunks in {bake_ms:.1f} ms")
+    print(f"lighting: {ms:.3f} ms/frame composite + one BLEND_MULT blit at 1280x768")
+
+
+def load_tilesets(map_data):
+    import pygame
+    from tilemap import parse_tileset, tileset_path
+
+    tilesets = []
+    for ts in map_data["tilesets"]:
+        info = parse_tileset(tileset_path(MAP_FOLDER, ts))
+        tilesets.append({
+            "name": info["name"], "firstgid": ts["firstgid"], "columns": info["columns"],
+            "image": pygame.image.load(info["image_path"]).convert_alpha(),
+            "tilewidth": map_data["tilewidth"], "tileheight": map_data["tileheight"],
+        })
+    return tilesets
+
+
+def bench_scroll(frames=300):
+    from scroll_renderer import ScrollRenderer
+
+    screen = init_display()
+    map_data, _ = load_map()
+    tilesets = load_tilesets(map_data)
+    renderer = ScrollRenderer(map_data, tilesets)
+    max_x = map_data["width"] * map_data["tilewidth"] - screen.get_width()
+    max_y = map_data["height"] * map_data["tileheight"] - screen.get_height()
+
+    def walk():
+        # Diagonal walk at player_speed (5 px/frame), bouncing off the map edges
+        x = y = 0
+        sx = sy = 5
+        while True:
+            if not 0 <= x + sx <= max_x:
+                sx = -sx
+            if not 0 <= y + sy <= max_y:
+                sy = -sy
+            x, y = x + sx, y + sy
+            yield x, y
+
+    for label, full in (("full redraw (culled)", True), ("scroll reuse", False)):
+        path = walk()
+        tiles = []
+
+        def frame():
+            if full:
+                renderer.invalidate()
+            renderer.draw(screen, next(path))
+            tiles.append(renderer.tiles_drawn)
+
+        ms = timed(frame, frames)
+        print(f"scroll: {label}: {sum(tiles) / len(tiles):.0f} tiles/frame, {ms:.3f} ms/frame")
+    total = sum(sum(1 for gid in layer["data"] if gid) for layer in map_data["layers"])
+    print(f"scroll: previous draw_map blitted every map tile: {total} tiles/frame")
+
+
+def bench_assets(switches=200, budget_mb=5):
+    from assets import AssetManager
+    from tilemap import parse_tileset, tileset_path, used_tilesets
+
+    init_display()
+    map_data, _ = load_map()
+    images = [parse_tileset(tileset_path(MAP_FOLDER, ts))["image_path"] for ts in map_data["tilesets"]]
+    used = used_tilesets(map_data)
+    print(f"assets: test.tmj lists {len(images)} tilesets, places tiles from {len(used)}")
+
+    # Several maps, each drawing from its own handful of the tilesets
+    rng = np.random.default_rng(0)
+    maps = [sorted(used)] + [sorted(rng.choice(len(images), 4, replace=False).tolist()) for _ in range(7)]
+    manager = AssetManager(budget_mb * 1024 * 1024)
+    held = []
+    peak = 0
+    start = time.perf_counter()
+    for i in range(switches):
+        wanted = [images[index] for index in maps[rng.integers(len(maps))]]
+        for path in wanted:
+            manager.acquire(path)
+        for path in held:
+            manager.release(path)
+        held = wanted
+        peak = max(peak, manager.used_bytes)
+    ms = (time.perf_counter() - start) * 1000 / switches
+    print(f"assets: {switches} map switches, {ms:.2f} ms each, {manager.loads} loads, {manager.evictions} evictions")
+    print(f"assets: peak {peak / 1024:.0f} KiB with a {budget_mb} MiB budget")
+    print(manager.report())
+
+
+def bench_fonts(rounds=20):
+    import pygame
+    from fonts import UI_FONTS, FontRegistry
+
+    pygame.init()
+
+    def sysfonts():
+        # What start_screen() and show_intro() used to do on every call
+        for family, size, bold in UI_FONTS:
+            pygame.font.SysFont(family, size, bold=bold)
+
+    fonts = FontRegistry()
+    start = time.perf_counter()
+    fonts.warm_up().join()
+    warm_ms = (time.perf_counter() - start) * 1000
+    sys_ms = timed(sysfonts, rounds)
+    cached_ms = timed(lambda: [fonts.get(*spec) for spec in UI_FONTS], rounds)
+    print(f"fonts: {len(UI_FONTS)} fonts, SysFont each time {sys_ms:.2f} ms, registry warm-up {warm_ms:.2f} ms "
+          f"once ({fonts.system_lookups} system lookups), cached {cached_ms:.4f} ms")
+
+
+def bench_minimap(rounds=50):
+    from minimap import Minimap
+
+    screen = init_display()
+    map_data, _ = load_map()
+    tilesets = load_tilesets(map_data)
+    start = time.perf_counter()
+    minimap = Minimap(map_data, tilesets)
+    build_ms = (time.perf_counter() - start) * 1000
+    full_ms = timed(lambda: minimap.update_tiles(0, 0, map_data["width"], map_data["height"]), rounds)
+    chunk_ms = timed(lambda: minimap.update_tiles(16, 16, 32, 32), rounds)
+    draw_ms = timed(lambda: minimap.draw(screen, (640, 640), [(20, 20)] * 4, (0, 0, 1280, 768)), rounds)
+    print(f"minimap: gid colours + build {build_ms:.1f} ms, full rebuild {full_ms:.2f} ms, "
+          f"16x16 update {chunk_ms:.3f} ms, draw + markers {draw_ms:.3f} ms/frame")
+
+
+def bench_telemetry(events=50000):
+    import tempfile
+    from telemetry import Telemetry, load_events, summarize
+
+    for suffix in (".jsonl.gz", ".db"):
+        path = os.path.join(tempfile.mkdtemp(), "events" + suffix)
+        # One burst that fits the ring; the writer only runs once it is over
+        telemetry = Telemetry(path, capacity=65536, flush_interval=60)
+        start = time.perf_counter()
+        for i in range(events):
+            telemetry.record("run", npc="Torchbearer Korr", solved=i % 4 == 0, lines=3, error=None)
+        record_ns = (time.perf_counter() - start) * 1e9 / events
+        start = time.perf_counter()
+        telemetry.stop()
+        drain_ms = (time.perf_counter() - start) * 1000
+        _, stats = summarize(load_events(path))
+        print(f"telemetry {suffix}: record {record_ns:.0f} ns/event, {telemetry.written} written, "
+              f"{telemetry.dropped} dropped, batched flush {drain_ms:.0f} ms, "
+              f"{os.path.getsize(path) / events:.1f} bytes/event, report sees {stats['Torchbearer Korr']['runs']} runs")
+
+
+def bench_particles(count=5000, frames=200):
+    from particles import CONFETTI, ParticleSystem
+
+    screen = init_display()
+    system = ParticleSystem(CONFETTI, capacity=count * 2, size=3, gravity=120, drag=0.2)
+    spent = {"emit": 0.0, "update": 0.0, "draw": 0.0}
+    live = []
+
+    def frame():
+        # Keep about `count` particles alive with steady respawns
+        for name, step in (
+            ("emit", lambda: system.emit(count - system.count, 640, 384, speed=(20, 120), life=(1.0, 3.0), spread=200)),
+            ("update", lambda: system.update(1 / 60)),
+            ("draw", lambda: system.draw(screen)),
+        ):
+            start = time.perf_counter()
+            step()
+            spent[name] += time.perf_counter() - start
+        live.append(system.count)
+
+    for _ in range(60):
+        frame()
+    for name in spent:
+        spent[name] = 0.0
+    live.clear()
+    frame_ms = timed(frame, frames)
+    parts = ", ".join(f"{name} {seconds * 1000 / frames:.3f} ms" for name, seconds in spent.items())
+    print(f"particles: {sum(live) / len(live):.0f} live, {parts}, {frame_ms:.3f} ms/frame")
+
+
+def bench_automap(size=1024, edits=50):
+    from automap import RULES_FILE, Automapper, generate_slopes, read_tmx
+
+    fields = read_tmx(os.path.join("The Fan-tasy Tileset (Free)", "Tiled", "Tilemaps", "Beginning Fields.tmx"))
+    start = time.perf_counter()
+    automapper = Automapper.from_rules_file(RULES_FILE, fields["tilesets"])
+    compile_ms = (time.perf_counter() - start) * 1000
+    slope = next(first for first, source in fields["tilesets"] if source.endswith("Tileset_RockSlope.tsx"))
+    markers = generate_slopes(size, (slope, slope + 1, slope + 2))
+    layers = {"RockSlopes": markers, "RockSlopes_Auto": np.zeros_like(markers)}
+    start = time.perf_counter()
+    automapper.apply(layers)
+    full_ms = (time.perf_counter() - start) * 1000
+    rng = np.random.default_rng(0)
+    spent = 0.0
+    for _ in range(edits):
+        x, y = rng.integers(0, size - 8, 2)
+        markers[y:y + 8, x:x + 8] = rng.choice([slope, slope + 1, slope + 2], (8, 8))
+        start = time.perf_counter()
+        automapper.apply(layers, x, y, x + 8, y + 8)
+        spent += time.perf_counter() - start
+    print(f"automap: {len(automapper.rules)} rules compiled in {compile_ms:.0f} ms, {size}x{size} map "
+          f"in {full_ms:.0f} ms ({(layers['RockSlopes_Auto'] != 0).sum()} tiles), "
+          f"8x8 edit re-applied in {spent * 1000 / edits:.2f} ms")
+
+
+def bench_efficiency():
+    from challenges import CHALLENGES
+    from sandbox import SandboxPool
+
+    # Vell's pairwise starter, a hidden-quadratic slice search, and linear answers,
+    # one of them using a top-level import and helper
+    submissions = {
+        "pairs": "\n".join(CHALLENGES["Archivist Vell"]["starter"]),
+        "slice": "def has_duplicate(items):\n    for i, x in enumerate(items):\n"
+                 "        if x in items[i + 1:]:\n            return True\n    return False",
+        "seen": "def has_duplicate(items):\n    seen = set()\n    for x in items:\n        if x in seen:\n"
+                "            return True\n        seen.add(x)\n    return False",
+        "set": "def has_duplicate(items):\n    return len(set(items)) != len(items)",
+        "counter": "from collections import Counter\n\ndef most(items):\n    return max(Counter(items).values())\n\n"
+                   "def has_duplicate(items):\n    return bool(items) and most(items) > 1",
+    }
+    pool = SandboxPool(workers=1)
+    try:
+        for name, code in submissions.items():
+            start = time.perf_counter()
+            result = pool.submit("Archivist Vell", code).result()
+            print(f"efficiency {name}: verdict in {(time.perf_counter() - start) * 1000:.0f} ms: {result['message']}")
+    finally:
+        pool.close()
+
+
+def bench_sprites(static=4000, moving=1000, frames=200, size=256):
+    from sprite_layer import SpriteLayer, solid_sprite
+
+    screen = init_display()
+    rng = np.random.default_rng(0)
+    layer = SpriteLayer(32, size)
+    tree = solid_sprite((40, 120, 40), (32, 32))
+    # Overhang-like tiles spread over a size x size tile world, plus wandering entities
+    layer.set_static([(tree, None, x, y, y + 64) for x, y in rng.integers(0, size * 32, (static, 2)).tolist()])
+    walker = solid_sprite((0, 255, 0), (16, 16))
+    pos = rng.uniform(0, size * 32, (moving, 2))
+    ids = [layer.add(walker, int(x), int(y), int(y) + 16) for x, y in pos]
+    camera = [0, 0]
+
+    def frame():
+        pos[:] = np.clip(pos + rng.uniform(-3, 3, pos.shape), 0, size * 32 - 1)
+        for sprite_id, (x, y) in zip(ids, pos.astype(int).tolist()):
+            layer.move(sprite_id, x, y, y + 16)
+        camera[0] = (camera[0] + 7) % (size * 32 - 1280)
+        camera[1] = (camera[1] + 5) % (size * 32 - 768)
+        layer.draw(screen, camera)
+
+    frame_ms = timed(frame, frames)
+    # The same scene with one full sort per frame, for comparison
+    sprites = layer.sprites
+
+    def sorted_frame():
+        pos[:] = np.clip(pos + rng.uniform(-3, 3, pos.shape), 0, size * 32 - 1)
+        for sprite_id, (x, y) in zip(ids, pos.astype(int).tolist()):
+            sprites[sprite_id][2:5] = x, y, y + 16
+        order = sorted(sprites, key=lambda sprite_id: sprites[sprite_id][4])
+        blits = []
+        for i in order:
+            x, y = sprites[i][2] - camera[0], sprites[i][3] - camera[1]
+            if -32 < x < 1280 and -32 < y < 768:
+                blits.append((sprites[i][0], (x, y)))
+        screen.blits(blits, doreturn=False)
+
+    sorted_ms = timed(sorted_frame, frames)
+    print(f"sprites: {static + moving} sprites ({moving} moving), {layer.drawn} on screen, "
+          f"buckets {frame_ms:.3f} ms/frame vs full sort {sorted_ms:.3f} ms/frame")
+
+
+def bench_text_layout(texts=40, repeat=200):
+    from fonts import FontRegistry
+    from text_layout import TextLayout
+
+    init_display()
+    font = FontRegistry().get(None, 28)
+    rng = np.random.default_rng(0)
+    words = ["scroll", "archive", "function", "Codemire", "the", "of", "a", "traveler", "forest", "rune",
+             "reversal", "loop", "print(i)", "return", "compare", "every", "pair", "O(n)", "gate", "mind"]
+    dialogue = [" ".join(rng.choice(words, 60)) for _ in range(texts)]
+    layout = TextLayout()
+    start = time.perf_counter()
+    pages = [layout.pages(text, font, 1140, 90, line_height=28) for text in dialogue]
+    cold_ms = (time.perf_counter() - start) / texts * 1000
+    hit_ms = timed(lambda: [layout.pages(text, font, 1140, 90, line_height=28) for text in dialogue], repeat) / texts
+    # Laying out the same texts through the per-frame queue, as the game does on approach
+    queued = TextLayout()
+    for text in dialogue:
+        queued.prepare(text, font, 1140, 90, line_height=28)
+    frames = 0
+    while queued.queue:
+        queued.pump(2.0)
+        frames += 1
+    print(f"text layout: {texts} texts, {sum(map(len, pages))} pages, cold {cold_ms:.3f} ms/text, "
+          f"cached {hit_ms * 1000:.2f} us/text, queue drained in {frames} frames at 2 ms each")
+
+
+BENCHMARKS = {
+    "entities": bench_entities,
+    "pathfinding": bench_pathfinding,
+    "save": bench_save,
+    "lighting": bench_lighting,
+    "scroll": bench_scroll,
+    "assets": bench_assets,
+    "fonts": bench_fonts,
+    "minimap": bench_minimap,
+    "telemetry": bench_telemetry,
+    "particles": bench_particles,
+    "automap": bench_automap,
+    "efficiency": bench_efficiency,
+    "sprites": bench_sprites,
+    "text_layout": bench_text_layout,
+}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Hero of Codemere benchmarks")
+    parser.add_argument("names", nargs="*", help=f"benchmarks to run (default: all of {', '.join(BENCHMARKS)})")
+    args = parser.parse_args()
+    unknown = [name for name in args.names if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"unknown benchmark: {', '.join(unknown)}")
+    for name in args.names or BENCHMARKS:
+        BENCHMARKS[name]()
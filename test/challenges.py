@@ -0,0 +1,113 @@
+import contextlib
+import io
+
+from efficiency import PLAYER_FILE, judge
+
+# === Challenge registry
+# Keyed by the NPC that gives the challenge. Each check receives the namespace
+# the player's code defined and everything it printed. Efficiency challenges add
+# a "perf" entry: once the check passes, the named function is benchmarked on a
+# ladder of input sizes and must grow no faster than "target" (see efficiency.py),
+# and "timeout" gives the sandbox the extra seconds that takes.
+
+
+def _check_rune(namespace, output):
+    return namespace.get("rune", None) == "single"
+
+
+def _check_loop(namespace, output):
+    return output.strip().splitlines() == [str(i) for i in range(1, 11)]
+
+
+def _check_add(namespace, output):
+    func = namespace.get("add", None)
+    return callable(func) and func(2, 3) == 5 and func(-1, 1) == 0
+
+
+def _check_duplicates(namespace, output):
+    func = namespace.get("has_duplicate", None)
+    return (callable(func) and func([3, 1, 4, 1, 5]) is True and func([2, 7, 1, 8]) is False
+            and func([]) is False and func(["a", "b", "a"]) is True)
+
+
+def _distinct_items(n, rng):
+    # Worst case for a duplicate search: no duplicates at all
+    items = list(range(n))
+    rng.shuffle(items)
+    return (items,)
+
+
+CHALLENGES = {
+    "Old Man Cedric": {
+        "starter": ["rune = 'elgnis'"],
+        "check": _check_rune,
+        "hint": "❌ Try again. Make sure 'rune' is correct.",
+    },
+    "Bugsy the Apprentice": {
+        "starter": ["for i in range(1, 10):", "    print(i)"],
+        "check": _check_loop,
+        "hint": "❌ That doesn't include 10.",
+    },
+    "Torchbearer Korr": {
+        "starter": ["def add(a, b):", "    return a - b"],
+        "check": _check_add,
+        "hint": "❌ Check your 'add' function.",
+    },
+    "Archivist Vell": {
+        "starter": [
+            "def has_duplicate(items):",
+            "    for i in range(len(items)):",
+            "        for j in range(i + 1, len(items)):",
+            "            if items[i] == items[j]:",
+            "                return True",
+            "    return False",
+        ],
+        "check": _check_duplicates,
+        "hint": "❌ has_duplicate must return True or False.",
+        "perf": {
+            "function": "has_duplicate",
+            "make_input": _distinct_items,
+            "sizes": [250, 500, 1000, 2000, 4000, 8000],
+            "target": "O(n)",
+            "unit": "scrolls",
+        },
+        "timeout": 6.0,
+    },
+}
+
+
+def find_challenge(name):
+    # Accepts the NPC name or its first or last word, e.g. "Old Man Cedric", "cedric", "bugsy"
+    if name in CHALLENGES:
+        return name
+    key = name.strip().lower()
+    for full_name in CHALLENGES:
+        words = full_name.lower().split()
+        if key in (full_name.lower(), words[0], words[-1]):
+            return full_name
+    return None
+
+
+def starter_code(name):
+    challenge = CHALLENGES.get(name)
+    return list(challenge["starter"]) if challenge else [""]
+
+
+def grade(name, code):
+    # Runs the player's code in-process; returns (solved, message)
+    challenge = CHALLENGES.get(name)
+    if challenge is None:
+        return False, f"⚠️ Error: unknown challenge {name!r}"
+    namespace = {}  # one dict for globals and locals, so the player's functions see their imports
+    output = io.StringIO()
+    try:
+        with contextlib.redirect_stdout(output):
+            exec(compile(code, PLAYER_FILE, "exec"), namespace)
+            solved = challenge["check"](namespace, output.getvalue())
+            if solved and "perf" in challenge:
+                return judge(namespace[challenge["perf"]["function"]], challenge["perf"])
+    except Exception as e:
+        return False, f"⚠️ Error: {str(e) or type(e).__name__}"
+    if solved:
+        return True, "✅ Correct!"
+    return False, challenge["hint"]
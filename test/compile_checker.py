@@ -0,0 +1,85 @@
+import threading
+import time
+
+# === Background syntax checking for the challenge editor
+# The buffer is only ever passed to compile(), never exec(), so no player code runs here.
+
+DEBOUNCE_MS = 350
+
+
+def check_source(source):
+    try:
+        compile(source, "<challenge>", "exec", dont_inherit=True)
+    except SyntaxError as e:
+        return {
+            "line": e.lineno or 1,
+            "col": e.offset or 1,
+            "message": e.msg,
+        }
+    except ValueError as e:  # e.g. source containing null bytes
+        return {"line": 1, "col": 1, "message": str(e)}
+    except (RecursionError, MemoryError):  # e.g. a line of 100k chained operators
+        return {"line": 1, "col": 1, "message": "code is too long or deeply nested to compile"}
+    except Exception as e:  # never let one buffer kill the checker thread
+        return {"line": 1, "col": 1, "message": f"could not compile: {e}"}
+    return None
+
+
+class CompileChecker:
+    def __init__(self, debounce_ms=DEBOUNCE_MS):
+        self.debounce = debounce_ms / 1000
+        self._cond = threading.Condition()
+        self._generation = 0
+        self._pending = None  # (generation, source, due time)
+        self._result = None   # (generation, error or None)
+        self._running = True
+        self._thread = threading.Thread(target=self._worker, daemon=True)
+        self._thread.start()
+
+    def submit(self, code_lines):
+        source = "\n".join(code_lines)
+        with self._cond:
+            # A newer buffer replaces any job that hasn't started yet
+            self._generation += 1
+            self._pending = (self._generation, source, time.monotonic() + self.debounce)
+            self._cond.notify()
+
+    def cancel(self):
+        with self._cond:
+            self._generation += 1
+            self._pending = None
+            self._result = None
+
+    def error(self):
+        # Keeps showing the last finished check until the next one lands
+        with self._cond:
+            if self._result:
+                return self._result[1]
+        return None
+
+    def stop(self):
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                while self._running and self._pending is None:
+                    self._cond.wait()
+                if not self._running:
+                    return
+                generation, source, due = self._pending
+                delay = due - time.monotonic()
+                if delay > 0:
+                    # Wait out the debounce, then re-check in case the player kept typing
+                    self._cond.wait(delay)
+                    continue
+                self._pending = None
+
+            error = check_source(source)
+
+            with self._cond:
+                # Drop results for buffers that changed or were cancelled while compiling
+                if generation == self._generation:
+                    self._result = (generation, error)
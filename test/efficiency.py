@@ -0,0 +1,130 @@
+import math
+import random
+import sys
+import time
+
+# === Efficiency grading
+# For challenges that teach algorithmic efficiency: once the player's function
+# is correct, it is run on a ladder of input sizes. Each rung is timed with no
+# tracing, then run again under sys.settrace counting line events in the
+# player's own code (operations). The ladder stops climbing once a rung gets
+# expensive, so a slow solution still finishes well inside the sandbox time
+# limit. Timings are taken as both wall time (what the player is shown) and
+# process CPU time (what the growth fit uses), since the game keeps running on
+# the same cores while the sandbox benchmarks.
+#
+# Growth is estimated by fitting each complexity class to the measurements in
+# log space (count ~ c * f(n)) and keeping the class with the smallest
+# residual. Operation counts are exact but miss work done inside builtins
+# (`x in some_list` is one line), so when the timings are large enough to trust
+# and put the function in a higher polynomial degree (n^2 where the counts say
+# n), the timing estimate wins. n vs n log n is too close to call from wall
+# time on a few rungs, so timings never decide between those two.
+
+PLAYER_FILE = "<player>"  # filename the player's code is compiled under
+
+COMPLEXITIES = [
+    ("O(1)", lambda n: 1.0),
+    ("O(log n)", lambda n: math.log2(n)),
+    ("O(n)", lambda n: float(n)),
+    ("O(n log n)", lambda n: n * math.log2(n)),
+    ("O(n^2)", lambda n: float(n) ** 2),
+    ("O(n^3)", lambda n: float(n) ** 3),
+]
+CLASS_NAMES = [name for name, _ in COMPLEXITIES]
+DEGREES = [0, 0, 1, 1, 2, 3]  # polynomial degree of each class
+
+OP_BUDGET = 400_000     # traced line events per rung before the ladder stops
+TIME_BUDGET_MS = 150    # untraced wall time per rung before the ladder stops
+TRUST_TIME_MS = 1.0     # the slowest rung must take this long before timings count
+MIN_TIMED_MS = 0.05     # rungs faster than this are left out of the timing fit
+MIN_RUNGS = 3
+
+
+def count_ops(func, args):
+    # Line events executed in frames compiled from the player's code
+    ops = 0
+
+    def local_trace(frame, event, arg):
+        nonlocal ops
+        if event == "line":
+            ops += 1
+        return local_trace
+
+    def global_trace(frame, event, arg):
+        return local_trace if frame.f_code.co_filename == PLAYER_FILE else None
+
+    sys.settrace(global_trace)
+    try:
+        func(*args)
+    finally:
+        sys.settrace(None)
+    return ops
+
+
+def time_call(func, args, repeats=5, budget_ms=50):
+    # Best (wall ms, CPU ms) of a few runs; slow calls stop repeating once over budget
+    wall = cpu = math.inf
+    spent = 0.0
+    for _ in range(repeats):
+        start, start_cpu = time.perf_counter(), time.process_time()
+        func(*args)
+        elapsed = (time.perf_counter() - start) * 1000
+        wall, cpu = min(wall, elapsed), min(cpu, (time.process_time() - start_cpu) * 1000)
+        spent += elapsed
+        if spent > budget_ms:
+            break
+    return wall, cpu
+
+
+def measure(func, make_input, sizes, seed=0):
+    # [{"n", "ops", "ms", "cpu_ms"}] for as many rungs of the ladder as the budgets allow
+    rungs = []
+    for n in sizes:
+        args = make_input(n, random.Random(seed + n))
+        ms, cpu_ms = time_call(func, args)
+        ops = count_ops(func, make_input(n, random.Random(seed + n)))
+        rungs.append({"n": n, "ops": ops, "ms": ms, "cpu_ms": cpu_ms})
+        if len(rungs) >= MIN_RUNGS and (ops > OP_BUDGET or ms > TIME_BUDGET_MS):
+            break
+    return rungs
+
+
+def estimate_growth(sizes, values):
+    # Index into COMPLEXITIES of the best log-space fit
+    logs = [math.log(max(v, 1e-9)) for v in values]
+    best, best_residual = 0, math.inf
+    for index, (_, f) in enumerate(COMPLEXITIES):
+        diffs = [lv - math.log(max(f(n), 1e-9)) for n, lv in zip(sizes, logs)]
+        mean = sum(diffs) / len(diffs)
+        residual = sum((d - mean) ** 2 for d in diffs)
+        # Prefer the smaller class unless a bigger one fits clearly better
+        if residual < best_residual - 0.05:
+            best, best_residual = index, residual
+    return best
+
+
+def analyse(rungs):
+    # (class index, by ops, by time or None when the timings are too small to trust)
+    sizes = [r["n"] for r in rungs]
+    by_ops = estimate_growth(sizes, [max(r["ops"], 1) for r in rungs])
+    trusted = [r for r in rungs if r["cpu_ms"] >= MIN_TIMED_MS]
+    by_time = None
+    if len(trusted) >= MIN_RUNGS and max(r["cpu_ms"] for r in trusted) >= TRUST_TIME_MS:
+        by_time = estimate_growth([r["n"] for r in trusted], [r["cpu_ms"] for r in trusted])
+    if by_time is not None and DEGREES[by_time] > DEGREES[by_ops]:
+        return by_time, by_ops, by_time
+    return by_ops, by_ops, by_time
+
+
+def judge(func, perf):
+    # perf: {"make_input": (n, rng) -> args, "sizes": [...], "target": "O(n)", "unit": "items"}
+    rungs = measure(func, perf["make_input"], perf["sizes"])
+    growth, _, _ = analyse(rungs)
+    target = CLASS_NAMES.index(perf["target"])
+    last = rungs[-1]
+    unit = perf.get("unit", "items")
+    detail = f"{last['n']} {unit}: {last['ops']:,} steps, {last['ms']:.1f} ms"
+    if growth <= target:
+        return True, f"✅ Correct and within {perf['target']} ({detail})"
+    return False, f"❌ Correct, but it grows like {CLASS_NAMES[growth]} ({detail}). Aim for {perf['target']}."
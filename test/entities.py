@@ -0,0 +1,106 @@
+import numpy as np
+
+# === Structure-of-arrays entity store
+# Every entity is a row in a handful of contiguous arrays, so movement and tile
+# collision for thousands of critters/projectiles is a few NumPy ops per frame.
+# Rows are kept packed: removing an entity moves the last row into its slot.
+
+
+class EntityStore:
+    def __init__(self, capacity=256):
+        self.count = 0
+        self.pos = np.zeros((capacity, 2), dtype=np.float32)
+        self.vel = np.zeros((capacity, 2), dtype=np.float32)  # pixels per second
+        self.size = np.zeros((capacity, 2), dtype=np.float32)
+        self.sprite = np.zeros(capacity, dtype=np.int32)
+        self.ids = np.zeros(capacity, dtype=np.int64)
+        self.index_of = {}
+        self._next_id = 0
+
+    def __len__(self):
+        return self.count
+
+    def _grow(self):
+        capacity = len(self.pos) * 2
+        for name in ("pos", "vel", "size", "sprite", "ids"):
+            old = getattr(self, name)
+            new = np.zeros((capacity,) + old.shape[1:], dtype=old.dtype)
+            new[:self.count] = old[:self.count]
+            setattr(self, name, new)
+
+    def add(self, x, y, w, h, sprite=0, vx=0.0, vy=0.0):
+        if self.count == len(self.pos):
+            self._grow()
+        i = self.count
+        self.pos[i] = (x, y)
+        self.vel[i] = (vx, vy)
+        self.size[i] = (w, h)
+        self.sprite[i] = sprite
+        entity_id = self._next_id
+        self._next_id += 1
+        self.ids[i] = entity_id
+        self.index_of[entity_id] = i
+        self.count += 1
+        return entity_id
+
+    def remove(self, entity_id):
+        i = self.index_of.pop(entity_id)
+        last = self.count - 1
+        if i != last:
+            for arr in (self.pos, self.vel, self.size, self.sprite, self.ids):
+                arr[i] = arr[last]
+            self.index_of[int(self.ids[i])] = i
+        self.count -= 1
+
+    def integrate(self, dt, collision_grid, tile_width, tile_height):
+        # Move each axis separately so entities slide along walls.
+        # Returns a mask of the entities that were blocked on either axis.
+        n = self.count
+        pos = self.pos[:n]
+        vel = self.vel[:n]
+        size = self.size[:n]
+
+        new_x = pos[:, 0] + vel[:, 0] * dt
+        hit_x = blocked(collision_grid, new_x, pos[:, 1], size, tile_width, tile_height)
+        pos[:, 0] = np.where(hit_x, pos[:, 0], new_x)
+
+        new_y = pos[:, 1] + vel[:, 1] * dt
+        hit_y = blocked(collision_grid, pos[:, 0], new_y, size, tile_width, tile_height)
+        pos[:, 1] = np.where(hit_y, pos[:, 1], new_y)
+
+        return hit_x | hit_y
+
+    def wander(self, rng, speed, turn_chance, blocked_mask=None):
+        # Randomly re-aim a fraction of entities (and every blocked one)
+        n = self.count
+        turn = rng.random(n) < turn_chance
+        if blocked_mask is not None:
+            turn |= blocked_mask
+        k = int(turn.sum())
+        if k:
+            angle = rng.random(k) * (2 * np.pi)
+            self.vel[:n][turn] = np.stack((np.cos(angle), np.sin(angle)), axis=1) * speed
+
+
+def blocked(collision_grid, x, y, size, tile_width, tile_height):
+    # Test all four corners of each box against the grid; outside the map counts as solid
+    rows, cols = collision_grid.shape
+    hit = np.zeros(len(x), dtype=bool)
+    right = x + size[:, 0] - 1
+    bottom = y + size[:, 1] - 1
+    for px, py in ((x, y), (right, y), (x, bottom), (right, bottom)):
+        tx = np.floor_divide(px, tile_width).astype(np.int32)
+        ty = np.floor_divide(py, tile_height).astype(np.int32)
+        inside = (tx >= 0) & (tx < cols) & (ty >= 0) & (ty < rows)
+        hit |= ~inside
+        hit |= collision_grid[np.clip(ty, 0, rows - 1), np.clip(tx, 0, cols - 1)]
+    return hit
+
+
+def spawn_on_walkable(store, rng, collision_grid, tile_width, tile_height, count, w, h, sprite=0):
+    free_rows, free_cols = np.nonzero(~collision_grid)
+    picks = rng.integers(0, len(free_rows), size=count)
+    for r, c in zip(free_rows[picks], free_cols[picks]):
+        x = c * tile_width + (tile_width - w) / 2
+        y = r * tile_height + (tile_height - h) / 2
+        store.add(x, y, w, h, sprite)
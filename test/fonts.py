@@ -0,0 +1,82 @@
+import os
+import threading
+
+import pygame
+
+# === Font registry
+# Every (family, size, bold) is resolved and opened once, then shared. A font
+# file dropped into fonts/ as <family>.ttf (and optionally <family>-bold.ttf) is
+# loaded by path, so the system font list is never scanned for that family.
+# warm_up() opens a list of fonts on a background thread while the title screen
+# is animating; get() on a font that is still loading just waits for it.
+
+FONT_DIR = "fonts"
+
+# Everything the game draws with, in the order the title screen needs them
+UI_FONTS = [
+    ("consolas", 72, True),
+    ("consolas", 28, False),
+    ("consolas", 24, False),
+    ("consolas", 40, True),
+    ("consolas", 36, False),
+    ("consolas", 18, False),
+    (None, 28, False),
+]
+
+
+class FontRegistry:
+    def __init__(self, font_dir=FONT_DIR):
+        self.font_dir = font_dir
+        self.fonts = {}
+        self.paths = {}
+        self.system_lookups = 0
+        # FreeType face creation isn't thread-safe; all opening happens under this lock
+        self.lock = threading.RLock()
+        self.warm_thread = None
+
+    def path(self, family, bold=False):
+        # (font file or None for pygame's default font, whether bold must be faked)
+        key = (family and family.lower(), bold)
+        with self.lock:
+            if key not in self.paths:
+                self.paths[key] = self._resolve(*key)
+            return self.paths[key]
+
+    def _resolve(self, family, bold):
+        if family is None:
+            return None, bold
+        names = [f"{family}-bold", family] if bold else [family]
+        for name in names:
+            for ext in (".ttf", ".otf"):
+                path = os.path.join(self.font_dir, name + ext)
+                if os.path.exists(path):
+                    return path, bold and name == family
+        # Not bundled: one system lookup (the first one scans the installed fonts)
+        self.system_lookups += 1
+        path = pygame.font.match_font(family, bold=bold)
+        if path is None:
+            return None, bold
+        # match_font falls back to the regular face when there is no bold one
+        return path, bold and path == pygame.font.match_font(family)
+
+    def get(self, family, size, bold=False):
+        key = (family and family.lower(), size, bold)
+        font = self.fonts.get(key)
+        if font is None:
+            with self.lock:
+                font = self.fonts.get(key)
+                if font is None:
+                    path, fake_bold = self.path(family, bold)
+                    font = pygame.font.Font(path, size)
+                    font.set_bold(fake_bold)
+                    self.fonts[key] = font
+        return font
+
+    def warm_up(self, specs=UI_FONTS):
+        def run():
+            for family, size, bold in specs:
+                self.get(family, size, bold)
+
+        self.warm_thread = threading.Thread(target=run, daemon=True)
+        self.warm_thread.start()
+        return self.warm_thread
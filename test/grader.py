@@ -0,0 +1,154 @@
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, wait
+
+from challenges import CHALLENGES, find_challenge
+from sandbox import DEFAULT_TIMEOUT, SandboxPool
+
+# === Offline batch grader
+# Grades student submissions with the same registry the game uses, spread over
+# the sandbox worker processes, and streams one result row per submission as it
+# finishes.
+#
+#   python grader.py submissions.jsonl --out results.csv
+#   python grader.py submissions/ --out results.jsonl --workers 8 --timeout 2
+#
+# JSONL input: one {"id": ..., "challenge": ..., "code": ...} object per line;
+# a line that is not such an object gets an error row and the batch goes on.
+# Directory input: *.py files; the challenge comes from --challenge or from the
+# name of the folder each file sits in (e.g. submissions/korr/alice.py).
+
+FIELDS = ["id", "challenge", "solved", "message", "ms"]
+
+
+def read_jsonl(path, default_challenge):
+    # (id, challenge, code, error): error is a message for records that can't be graded
+    with open(path, encoding="utf-8", errors="replace") as f:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as e:
+                yield str(line_number), default_challenge, None, f"⚠️ Error: line {line_number} is not valid JSON ({e.msg})"
+                continue
+            if not isinstance(record, dict):
+                yield str(line_number), default_challenge, None, f"⚠️ Error: line {line_number} is not a JSON object"
+                continue
+            submission_id = str(record.get("id", line_number))
+            challenge = record.get("challenge", default_challenge)
+            code = record.get("code")
+            if not isinstance(code, str):
+                yield submission_id, challenge, None, f"⚠️ Error: line {line_number} has no \"code\" string"
+                continue
+            yield submission_id, challenge, code, None
+
+
+def read_directory(path, default_challenge):
+    for folder, _, files in sorted(os.walk(path)):
+        for filename in sorted(files):
+            if not filename.endswith(".py"):
+                continue
+            file_path = os.path.join(folder, filename)
+            with open(file_path, encoding="utf-8", errors="replace") as f:
+                code = f.read()
+            challenge = default_challenge or os.path.basename(folder)
+            yield os.path.relpath(file_path, path), challenge, code, None
+
+
+class ResultWriter:
+    def __init__(self, path):
+        self.file = open(path, "w", newline="", encoding="utf-8") if path else sys.stdout
+        self.csv = None
+        if path and path.endswith(".csv"):
+            self.csv = csv.DictWriter(self.file, fieldnames=FIELDS)
+            self.csv.writeheader()
+
+    def write(self, row):
+        if self.csv:
+            self.csv.writerow(row)
+        else:
+            self.file.write(json.dumps(row, ensure_ascii=False) + "\n")
+        self.file.flush()
+
+    def close(self):
+        if self.file is not sys.stdout:
+            self.file.close()
+
+
+def grade_all(submissions, pool, writer, max_in_flight):
+    totals = {"graded": 0, "solved": 0, "errors": 0}
+    in_flight = {}
+
+    def collect(done):
+        for future in done:
+            submission_id, challenge = in_flight.pop(future)
+            result = future.result()
+            writer.write({"id": submission_id, "challenge": challenge, "solved": result["solved"],
+                          "message": result["message"], "ms": round(result["ms"], 3)})
+            totals["graded"] += 1
+            totals["solved"] += result["solved"]
+            totals["errors"] += result["message"].startswith("⚠️")
+
+    def reject(submission_id, challenge, message):
+        writer.write({"id": submission_id, "challenge": challenge, "solved": False, "message": message, "ms": 0})
+        totals["graded"] += 1
+        totals["errors"] += 1
+
+    for submission_id, challenge_name, code, error in submissions:
+        if error:
+            reject(submission_id, challenge_name, error)
+            continue
+        challenge = find_challenge(str(challenge_name or ""))
+        if challenge is None:
+            reject(submission_id, challenge_name, f"⚠️ Error: unknown challenge {challenge_name!r}")
+            continue
+        # Keep a bounded window in flight so huge inputs never sit in memory
+        if len(in_flight) >= max_in_flight:
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            collect(done)
+        in_flight[pool.submit(challenge, code)] = (submission_id, challenge)
+
+    while in_flight:
+        done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+        collect(done)
+    return totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Grade Hero of Codemere challenge submissions in bulk")
+    parser.add_argument("source", help="a .jsonl file or a directory of .py files")
+    parser.add_argument("--out", help="results file (.csv or .jsonl); defaults to JSONL on stdout")
+    parser.add_argument("--challenge", help=f"challenge for every submission ({', '.join(CHALLENGES)})")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT, help="seconds per submission")
+    args = parser.parse_args()
+
+    if os.path.isdir(args.source):
+        submissions = read_directory(args.source, args.challenge)
+    else:
+        submissions = read_jsonl(args.source, args.challenge)
+
+    pool = SandboxPool(args.workers, args.timeout)
+    writer = ResultWriter(args.out)
+    start = time.perf_counter()
+    try:
+        totals = grade_all(submissions, pool, writer, pool.workers * 8)
+    finally:
+        writer.close()
+        pool.close()
+    elapsed = time.perf_counter() - start
+    print(
+        f"graded {totals['graded']} submissions in {elapsed:.2f} s "
+        f"({totals['graded'] / elapsed:.0f}/s on {pool.workers} workers): "
+        f"{totals['solved']} solved, {totals['errors']} errors",
+        file=sys.stderr,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+import json
+import os
+import xml.etree.ElementTree as ET
+
+import numpy as np
+
+from tilemap import layer_grid, parse_tileset, tile_layers, tileset_path
+
+# === Development hot reload
+# Turned on with HOC_HOT_RELOAD=1. Polls the modification times of the map, the
+# .tsx files it references and their images (plain os.stat, no watcher
+# services) and works out the smallest change to apply:
+#   - tile rectangles, at most one per CHUNK_TILES chunk, that differ between the
+#     previous and the new map file (so tiles restored from a save are untouched
+#     unless the designer edited them too)
+#   - indices of tilesets whose .tsx or image changed
+# main.py applies that to the live collision grid, lighting and renderer.
+
+POLL_MS = 500
+CHUNK_TILES = 16
+
+
+def enabled():
+    return os.environ.get("HOC_HOT_RELOAD", "") not in ("", "0")
+
+
+def _mtime(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+class FileWatcher:
+    def __init__(self, paths=()):
+        self.mtimes = {}
+        self.watch(paths)
+
+    def watch(self, paths):
+        for path in paths:
+            self.mtimes[path] = _mtime(path)
+
+    def retry(self, path):
+        # Report the file again on the next poll, e.g. after catching it half-written
+        self.mtimes[path] = None
+
+    def poll(self):
+        changed = []
+        for path, old in self.mtimes.items():
+            new = _mtime(path)
+            if new != old:
+                self.mtimes[path] = new
+                changed.append(path)
+        return changed
+
+
+def file_grids(map_data):
+    return np.stack([layer_grid(map_data, layer) for layer in tile_layers(map_data)])
+
+
+def changed_regions(old, new, chunk=CHUNK_TILES):
+    # Tight (x0, y0, x1, y1) box of changed tiles inside each touched chunk
+    mask = (old != new).any(axis=0)
+    regions = []
+    height, width = mask.shape
+    for cy in range(0, height, chunk):
+        for cx in range(0, width, chunk):
+            block = mask[cy:cy + chunk, cx:cx + chunk]
+            if not block.any():
+                continue
+            rows = np.flatnonzero(block.any(axis=1))
+            cols = np.flatnonzero(block.any(axis=0))
+            regions.append((cx + cols[0], cy + rows[0], cx + cols[-1] + 1, cy + rows[-1] + 1))
+    return regions
+
+
+class HotReloader:
+    def __init__(self, map_file, map_data, map_folder, poll_ms=POLL_MS):
+        self.map_file = map_file
+        self.map_folder = map_folder
+        self.poll_ms = poll_ms
+        self.timer = 0
+        self.grids = file_grids(map_data)
+        self.tileset_refs = [(ts["firstgid"], ts["source"]) for ts in map_data["tilesets"]]
+        self.tileset_files = []  # per tileset: (tsx path, image path)
+        self.watcher = FileWatcher([map_file])
+        for ts in map_data["tilesets"]:
+            self._watch_tileset(ts)
+
+    def _watch_tileset(self, ts):
+        tsx = tileset_path(self.map_folder, ts)
+        files = (tsx, parse_tileset(tsx)["image_path"])
+        self.tileset_files.append(files)
+        self.watcher.watch(files)
+
+    def poll(self, dt):
+        # None, or {"tiles": regions, "old"/"new": file grids, "tilesets": indices}
+        self.timer += dt
+        if self.timer < self.poll_ms:
+            return None
+        self.timer = 0
+        changed = set(self.watcher.poll())
+        if not changed:
+            return None
+
+        result = {"tiles": [], "old": self.grids, "new": self.grids, "tilesets": []}
+        if self.map_file in changed:
+            try:
+                with open(self.map_file) as f:
+                    new_map = json.load(f)
+                grids = file_grids(new_map)
+                refs = [(ts["firstgid"], ts["source"]) for ts in new_map["tilesets"]]
+            except (OSError, ValueError, KeyError) as e:
+                print(f"Hot reload: could not read {self.map_file}: {e}")
+                self.watcher.retry(self.map_file)
+            else:
+                if grids.shape != self.grids.shape or refs != self.tileset_refs:
+                    print("Hot reload: map size, layers or tileset list changed; restart to pick that up")
+                else:
+                    result["tiles"] = changed_regions(self.grids, grids)
+                    result["new"] = grids
+                    self.grids = grids
+
+        for index, (tsx, image) in enumerate(self.tileset_files):
+            if tsx in changed:
+                # The .tsx may now point at a different image
+                try:
+                    image = parse_tileset(tsx)["image_path"]
+                except (OSError, ET.ParseError) as e:
+                    print(f"Hot reload: could not read {tsx}: {e}")
+                    self.watcher.retry(tsx)
+                    continue
+                self.tileset_files[index] = (tsx, image)
+                if image not in self.watcher.mtimes:
+                    self.watcher.watch([image])
+            elif image not in changed:
+                continue
+            result["tilesets"].append(index)
+        if not result["tiles"] and not result["tilesets"]:
+            return None
+        return result
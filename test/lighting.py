@@ -0,0 +1,174 @@
+import numpy as np
+import pygame
+
+# === Light map and fog of war
+# Lighting is worked out on a coarse grid (LIGHT_CELL pixels per cell), never per
+# screen pixel or per tile blit:
+#   - static lights (lamp posts, campfires) are baked once per chunk at load into
+#     small surfaces holding ambient + light colour for each cell
+#   - the player's torch is one cached radial-gradient surface added on top
+#   - the fog surface has one pixel per tile: black until visited, white after
+# Each frame the visible part of those is composited on a small surface, scaled
+# up once and multiplied over the world with a single BLEND_MULT blit.
+
+LIGHT_CELL = 8
+CHUNK_TILES = 16
+AMBIENT = (110, 115, 160)
+TORCH_RADIUS = 160  # pixels
+TORCH_COLOR = (200, 170, 120)
+REVEAL_RADIUS = 7   # tiles
+
+LANTERN = (4.5, (255, 200, 110))
+CAMPFIRE = (6.0, (255, 150, 60))
+
+# Light-emitting tiles per tileset name: local tile id -> (radius in tiles, colour).
+# A tile can also carry a "light" property (radius in tiles) in its .tsx.
+DEFAULT_LIGHTS = {
+    "Props": {20: LANTERN, 21: LANTERN, 39: CAMPFIRE, 40: CAMPFIRE},
+}
+
+
+def light_gids(tilesets):
+    gids = {}
+    for ts in tilesets:
+        for tile_id, light in DEFAULT_LIGHTS.get(ts.get("name"), {}).items():
+            gids[ts["firstgid"] + tile_id] = light
+        for tile_id, radius in ts.get("lights", {}).items():
+            gids[ts["firstgid"] + tile_id] = (radius, LANTERN[1])
+    return gids
+
+
+def radial_gradient(radius_cells, color):
+    size = radius_cells * 2 + 1
+    y, x = np.mgrid[0:size, 0:size] - radius_cells
+    falloff = np.clip(1 - np.hypot(x, y) / radius_cells, 0, 1) ** 2
+    pixels = (falloff[..., None] * np.asarray(color, dtype=np.float32)).astype(np.uint8)
+    return pygame.surfarray.make_surface(pixels.transpose(1, 0, 2))
+
+
+class LightingLayer:
+    def __init__(self, map_data, gid_lights, cell_size=LIGHT_CELL, ambient=AMBIENT):
+        self.map_data = map_data
+        self.tile_width = map_data["tilewidth"]
+        self.tile_height = map_data["tileheight"]
+        self.width = map_data["width"]
+        self.height = map_data["height"]
+        self.cell = cell_size
+        self.ambient = np.asarray(ambient, dtype=np.float32)
+        self.gid_lights = gid_lights
+        self.enabled = True
+
+        self.lights = self._find_lights()
+        self.chunks = {}
+        for cy in range((self.height + CHUNK_TILES - 1) // CHUNK_TILES):
+            for cx in range((self.width + CHUNK_TILES - 1) // CHUNK_TILES):
+                self.bake_chunk(cx, cy)
+
+        self.torch = radial_gradient(TORCH_RADIUS // cell_size, TORCH_COLOR)
+        self.visited = np.zeros((self.height, self.width), dtype=bool)
+        self.fog = pygame.Surface((self.width, self.height))
+        self.fog.fill((0, 0, 0))
+        self._last_reveal = None
+        self._frame = None
+
+    def _find_lights(self):
+        # (x, y, radius, colour) in pixels, one per light-emitting tile
+        lights = []
+        for layer in self.map_data["layers"]:
+            if layer["type"] != "tilelayer":
+                continue
+            for i, gid in enumerate(layer["data"]):
+                light = self.gid_lights.get(gid)
+                if light:
+                    radius, color = light
+                    x = (i % self.width + 0.5) * self.tile_width
+                    y = (i // self.width + 0.5) * self.tile_height
+                    lights.append((x, y, radius * self.tile_width, np.asarray(color, dtype=np.float32)))
+        return lights
+
+    def bake_chunk(self, cx, cy):
+        # Ambient plus every static light that reaches the chunk, one value per cell
+        x0 = cx * CHUNK_TILES * self.tile_width
+        y0 = cy * CHUNK_TILES * self.tile_height
+        x1 = min(x0 + CHUNK_TILES * self.tile_width, self.width * self.tile_width)
+        y1 = min(y0 + CHUNK_TILES * self.tile_height, self.height * self.tile_height)
+        xs = np.arange(x0, x1, self.cell, dtype=np.float32) + self.cell / 2
+        ys = np.arange(y0, y1, self.cell, dtype=np.float32) + self.cell / 2
+        light = np.broadcast_to(self.ambient, (len(xs), len(ys), 3)).copy()
+        for lx, ly, radius, color in self.lights:
+            if lx + radius < x0 or lx - radius > x1 or ly + radius < y0 or ly - radius > y1:
+                continue
+            dist = np.hypot(xs[:, None] - lx, ys[None, :] - ly)
+            falloff = np.clip(1 - dist / radius, 0, 1) ** 2
+            light += falloff[..., None] * color
+        self.chunks[(cx, cy)] = pygame.surfarray.make_surface(np.clip(light, 0, 255).astype(np.uint8))
+
+    def rebake_tiles(self, x0, y0, x1, y1):
+        # Re-scan lights and rebake the chunks a changed tile rectangle can affect
+        self.lights = self._find_lights()
+        reach = int(max((r for _, _, r, _ in self.lights), default=0) // self.tile_width) + 1
+        for cy in range(max(0, (y0 - reach) // CHUNK_TILES), min(self.height - 1, y1 + reach) // CHUNK_TILES + 1):
+            for cx in range(max(0, (x0 - reach) // CHUNK_TILES), min(self.width - 1, x1 + reach) // CHUNK_TILES + 1):
+                self.bake_chunk(cx, cy)
+
+    def reveal(self, tile_x, tile_y, radius=REVEAL_RADIUS):
+        if self._last_reveal == (tile_x, tile_y, radius):
+            return
+        self._last_reveal = (tile_x, tile_y, radius)
+        x0, x1 = max(0, tile_x - radius), min(self.width, tile_x + radius + 1)
+        y0, y1 = max(0, tile_y - radius), min(self.height, tile_y + radius + 1)
+        ys, xs = np.mgrid[y0:y1, x0:x1]
+        inside = (xs - tile_x) ** 2 + (ys - tile_y) ** 2 <= radius * radius
+        window = self.visited[y0:y1, x0:x1]
+        fresh = inside & ~window
+        if not fresh.any():
+            return
+        window |= fresh
+        pixels = pygame.surfarray.pixels3d(self.fog)
+        pixels[x0:x1, y0:y1][fresh.T] = 255
+        del pixels
+
+    def draw(self, target, camera_offset, torch_pos=None):
+        if not self.enabled:
+            return
+        view_w, view_h = target.get_size()
+        cam_x, cam_y = camera_offset
+        tw, th = self.tile_width, self.tile_height
+
+        # Work on whole tiles so chunks and fog line up with the cell grid
+        first_tx, first_ty = cam_x // tw, cam_y // th
+        cols = (cam_x + view_w) // tw - first_tx + 1
+        rows = (cam_y + view_h) // th - first_ty + 1
+        cells_per_tile_x, cells_per_tile_y = tw // self.cell, th // self.cell
+        size = (cols * cells_per_tile_x, rows * cells_per_tile_y)
+        if self._frame is None or self._frame.get_size() != size:
+            self._frame = pygame.Surface(size)
+        frame = self._frame
+        frame.fill((0, 0, 0))
+
+        chunk_px = CHUNK_TILES * cells_per_tile_x, CHUNK_TILES * cells_per_tile_y
+        for cy in range(first_ty // CHUNK_TILES, (first_ty + rows - 1) // CHUNK_TILES + 1):
+            for cx in range(first_tx // CHUNK_TILES, (first_tx + cols - 1) // CHUNK_TILES + 1):
+                chunk = self.chunks.get((cx, cy))
+                if chunk:
+                    frame.blit(chunk, ((cx * CHUNK_TILES - first_tx) * cells_per_tile_x,
+                                       (cy * CHUNK_TILES - first_ty) * cells_per_tile_y))
+
+        if torch_pos:
+            r = self.torch.get_width() // 2
+            tx = (torch_pos[0] - first_tx * tw) // self.cell - r
+            ty = (torch_pos[1] - first_ty * th) // self.cell - r
+            frame.blit(self.torch, (tx, ty), special_flags=pygame.BLEND_ADD)
+
+        fog_view = pygame.Rect(first_tx, first_ty, cols, rows).clip(self.fog.get_rect())
+        if fog_view.size != (cols, rows):
+            # Viewport reaches past the map edge; anything outside stays dark
+            fog_window = pygame.Surface((cols, rows))
+            fog_window.fill((0, 0, 0))
+            fog_window.blit(self.fog, (fog_view.x - first_tx, fog_view.y - first_ty), fog_view)
+        else:
+            fog_window = self.fog.subsurface(fog_view)
+        frame.blit(pygame.transform.scale(fog_window, size), (0, 0), special_flags=pygame.BLEND_MULT)
+
+        light = pygame.transform.smoothscale(frame, (cols * tw, rows * th))
+        target.blit(light, (first_tx * tw - cam_x, first_ty * th - cam_y), special_flags=pygame.BLEND_MULT)
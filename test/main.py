@@ -1,18 +1,41 @@
 import json
 import pygame
 import os
+import struct
 import xml.etree.ElementTree as ET
-import io
-import contextlib
+import zlib
+import numpy as np
+from assets import AssetManager, budget_from_env
+from challenges import starter_code
+from compile_checker import CompileChecker
+from entities import EntityStore, spawn_on_walkable
+from fonts import FontRegistry
+from hot_reload import HotReloader, enabled as hot_reload_enabled
+from lighting import CAMPFIRE, LightingLayer, light_gids
+from minimap import Minimap
+from particles import CONFETTI, SPARKS, SPLASH, ParticleSystem
+from pathfinding import Pathfinder
+from render_target import RenderTarget, size_from_env
+from sandbox import KILL_GRACE, SandboxPool
+from scroll_renderer import ScrollRenderer
+from sprite_layer import SpriteLayer, solid_sprite, split_overhangs, tall_gids
+from save_system import AUTOSAVE_FILE, CHUNK_SIZE, Autosaver, Snapshot, pack_chunk, unpack_chunk
+from telemetry import Telemetry, path_from_env as telemetry_path_from_env
+from text_layout import TextLayout
+from tilemap import build_collision_grid, layer_grid, parse_tileset, tile_layers, tileset_path, update_collision_region, used_tilesets
 
 # === Setup
 pygame.init()
 
 pygame.mixer.init()
 
+# Fonts open in the background while the title screen fades in
+fonts = FontRegistry()
+fonts.warm_up()
+
+telemetry = Telemetry(telemetry_path_from_env())
+
 paused = False
-pause_font = pygame.font.SysFont("consolas", 36)
-hint_font = pygame.font.SysFont("consolas", 18)
 
 # Your music files
 music_playlist = [
@@ -29,7 +52,7 @@ def play_music(index):
         pygame.mixer.music.load(music_playlist[index])
         pygame.mixer.music.set_volume(0.6)
         pygame.mixer.music.play(fade_ms=3000)  # fade-in
-        print(f"Now playing: {music_playlist[index]}")
+        telemetry.record("music", track=music_playlist[index])
     except pygame.error as e:
         print(f"Error loading music: {e}")
 
@@ -39,6 +62,10 @@ screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
 clock = pygame.time.Clock()
 pygame.display.set_caption("Camera Map Viewer")
 
+# World is drawn at the internal resolution (F2 cycles it), UI at window resolution
+render_target = RenderTarget(screen, size_from_env((SCREEN_WIDTH, SCREEN_HEIGHT)))
+world = render_target.surface
+
 # === Paths
 MAP_FOLDER = "map"
 MAP_FILE = os.path.join(MAP_FOLDER, "test.tmj")
@@ -56,60 +83,123 @@ map_height = map_data["height"]
 scene = "map"
 active_npc = None
 dialogue_index = 0
-dialogue_lines = []
-challenge_prompt = []
+dialogue_pages = []
+prompt_pages = []
+prompt_page = 0
 code_lines = [""]
 cursor_line = 0
 cursor_col = 0
 cursor_visible = True
 output_message = ""
 challenge_solved = False
+solved_challenges = set()
+challenge_started_ms = 0
 show_congrats = False
 continue_button_rect = pygame.Rect(550, 370, 180, 40)
 run_button_rect = pygame.Rect(SCREEN_WIDTH - 140, 20, 120, 40)
+syntax_checker = CompileChecker()
+# Run Code grades in a sandbox worker; the verdict is polled each frame
+grader_pool = SandboxPool(workers=1)
+pending_verdict = None  # (npc name, lines submitted, Future, deadline in ticks)
+verdict_slack_ms = 2000  # on top of the sandbox's own kill timer, for a respawn
 
 # === Load all external tilesets
-tilesets = []
-collidable_gids = set()
-
-for ts in map_data["tilesets"]:
-    tsx_path = os.path.normpath(os.path.join(MAP_FOLDER, ts["source"]))
-    firstgid = ts["firstgid"]
-
-    tree = ET.parse(tsx_path)
-    root = tree.getroot()
-
-    columns = int(root.attrib["columns"])
-    image = root.find("image")
-    image_path = os.path.normpath(os.path.join(os.path.dirname(tsx_path), image.attrib["source"]))
-    image_surface = pygame.image.load(image_path).convert_alpha()
-
-    for tile in root.findall("tile"):
-        tile_id = int(tile.attrib["id"])
-        properties = tile.find("properties")
-        if properties:
-            for prop in properties.findall("property"):
-                if prop.attrib["name"].lower() == "collision" and prop.attrib["value"] == "true":
-                    collidable_gids.add(firstgid + tile_id)
-
-    tilesets.append({
-        "firstgid": firstgid,
-        "columns": columns,
-        "image": image_surface,
+# Atlases come from the asset manager and only for tilesets the map places tiles
+# from; the rest keep their metadata (collision, lights) with "image": None.
+asset_manager = AssetManager(budget_from_env())
+
+def load_tileset(ts, used=True, reload=False):
+    info = parse_tileset(tileset_path(MAP_FOLDER, ts))
+    if reload:
+        asset_manager.reload(info["image_path"])
+    return {
+        "name": info["name"],
+        "firstgid": ts["firstgid"],
+        "columns": info["columns"],
+        "tilecount": info["tilecount"],
+        "lights": info["lights"],
+        "collidable": info["collidable"],
+        "image_path": info["image_path"],
+        "image": asset_manager.acquire(info["image_path"]) if used else None,
         "tilewidth": tile_width,
         "tileheight": tile_height,
-    })
+    }
+
+def release_tileset(ts):
+    if ts["image"] is not None:
+        asset_manager.release(ts["image_path"])
+        ts["image"] = None
+
+def sync_tileset_usage():
+    # Load atlases newly placed tiles need and hand back ones no tile uses anymore
+    used = used_tilesets(map_data)
+    changed = False
+    for index, ts in enumerate(tilesets):
+        if index in used and ts["image"] is None:
+            ts["image"] = asset_manager.acquire(ts["image_path"])
+            changed = True
+        elif index not in used and ts["image"] is not None:
+            release_tileset(ts)
+            changed = True
+    if changed:
+        map_renderer.set_tilesets(tilesets)
+        minimap.set_tilesets(tilesets)
+    return changed
+
+def tileset_collidable_gids(tilesets):
+    return {ts["firstgid"] + tile_id for ts in tilesets for tile_id in ts["collidable"]}
+
+used = used_tilesets(map_data)
+tilesets = [load_tileset(ts, index in used) for index, ts in enumerate(map_data["tilesets"])]
+collidable_gids = tileset_collidable_gids(tilesets)
+
+collision_grid = build_collision_grid(map_data, collidable_gids)
+pathfinder = Pathfinder(~collision_grid)
+lighting = LightingLayer(map_data, light_gids(tilesets))
+map_renderer = ScrollRenderer(map_data, tilesets)
+minimap = Minimap(map_data, tilesets)
+sprite_layer = SpriteLayer(tile_height, map_height)
+
+overhangs = {}  # (tile layer, flat index) -> (gid, ground row, sprite id or None)
+
+def refresh_overhangs(rect=None):
+    # Tree and building tiles above their base row move from the map into the
+    # depth-sorted sprite layer, so entities can walk behind them. rect is the
+    # (x0, y0, x1, y1) of changed tiles; None re-splits the whole map, e.g. after
+    # atlases changed and every overhang needs its image looked up again.
+    areas, pieces = split_overhangs(map_data, tall_gids(tilesets), rect)
+    new = {(layer, flat): (gid, ground) for layer, flat, gid, ground in pieces}
+    hide = [set() for _ in areas]
+    show = [set() for _ in areas]
+    for key in [key for key in overhangs if areas[key[0]] is None or key[1] in areas[key[0]]]:
+        gid, ground, sprite_id = overhangs[key]
+        if rect is not None and new.get(key) == (gid, ground):
+            del new[key]  # unchanged
+            continue
+        if sprite_id is not None:
+            sprite_layer.remove(sprite_id)
+        del overhangs[key]
+        if key not in new:
+            show[key[0]].add(key[1])
+    for (layer, flat), (gid, ground) in new.items():
+        source = map_renderer.sources.get(gid)
+        sprite_id = None
+        if source:
+            y, x = divmod(flat, map_width)
+            sprite_id = sprite_layer.add(source[0], x * tile_width, y * tile_height, ground * tile_height, source[1])
+        overhangs[layer, flat] = (gid, ground, sprite_id)
+        hide[layer].add(flat)
+    for index in range(len(areas)):
+        map_renderer.update_hidden(index, hide[index], show[index])
+
+refresh_overhangs()
+hot_reloader = HotReloader(MAP_FILE, map_data, MAP_FOLDER) if hot_reload_enabled() else None
 
-def get_tileset_for_gid(gid):
-    for i in range(len(tilesets) - 1, -1, -1):
-        if gid >= tilesets[i]["firstgid"]:
-            return tilesets[i]
-    return None
 def start_screen():
     # Fonts
-    title_font = pygame.font.SysFont("consolas", 72, bold=True)
-    subtitle_font = pygame.font.SysFont("consolas", 28)
-    prompt_font = pygame.font.SysFont("consolas", 24)
+    title_font = fonts.get("consolas", 72, bold=True)
+    subtitle_font = fonts.get("consolas", 28)
+    prompt_font = fonts.get("consolas", 24)
 
     code_green = (0, 255, 0)
     clock = pygame.time.Clock()
@@ -227,8 +317,8 @@ def start_screen():
 
 
 def show_intro():
-    intro_font = pygame.font.SysFont("consolas", 28)
-    title_font = pygame.font.SysFont("consolas", 40, bold=True)
+    intro_font = fonts.get("consolas", 28)
+    title_font = fonts.get("consolas", 40, bold=True)
     code_green = (0, 255, 0)
 
     clock = pygame.time.Clock()
@@ -309,39 +399,10 @@ def show_intro():
 def is_colliding(x, y):
     tile_x = x // tile_width
     tile_y = y // tile_height
-    tile_index = tile_y * map_width + tile_x
-    for layer in map_data["layers"]:
-        if layer["type"] != "tilelayer":
-            continue
-        if tile_index < len(layer["data"]):
-            gid = layer["data"][tile_index]
-            if gid in collidable_gids:
-                return True
+    if 0 <= tile_x < map_width and 0 <= tile_y < map_height:
+        return bool(collision_grid[tile_y, tile_x])
     return False
 
-def draw_map(camera_offset):
-    for layer in map_data["layers"]:
-        if layer["type"] != "tilelayer":
-            continue
-        for i, gid in enumerate(layer["data"]):
-            if gid == 0:
-                continue
-            ts = get_tileset_for_gid(gid)
-            if not ts:
-                continue
-            local_gid = gid - ts["firstgid"]
-            col = local_gid % ts["columns"]
-            row = local_gid // ts["columns"]
-            tile_rect = pygame.Rect(
-                col * ts["tilewidth"],
-                row * ts["tileheight"],
-                ts["tilewidth"],
-                ts["tileheight"]
-            )
-            x = (i % map_width) * tile_width
-            y = (i // map_width) * tile_height
-            screen.blit(ts["image"], (x - camera_offset[0], y - camera_offset[1]), tile_rect)
-
 def draw_popup():
     popup_rect = pygame.Rect(400, 300, 480, 150)
     pygame.draw.rect(screen, (0, 100, 0), popup_rect)
@@ -361,68 +422,81 @@ def draw_error_message():
         text = font.render(output_message, True, (255, 255, 255))
         screen.blit(text, (error_rect.x + 10, error_rect.y + 8))
 
+def draw_syntax_marker(code_rect, line_height):
+    error = syntax_checker.error()
+    if not error:
+        return
+    line_index = min(error["line"], len(code_lines)) - 1
+    line = code_lines[line_index]
+    col = max(0, min(error["col"] - 1, len(line)))
+    x = code_rect.x + 10 + font.size(line[:col])[0]
+    y = code_rect.y + 10 + line_index * line_height + line_height - 8
+    width = max(font.size(line[col:col + 1] or " ")[0], 8)
+    # Squiggle under the offending column plus a gutter marker
+    points = [(x + i * 3, y + (i % 2) * 3) for i in range(width // 3 + 1)]
+    pygame.draw.lines(screen, (255, 60, 60), False, points, 2)
+    pygame.draw.rect(screen, (255, 60, 60), (code_rect.x + 2, y - line_height + 12, 4, line_height - 8))
+    text = hint_font.render(f"Line {error['line']}, col {error['col']}: {error['message']}", True, (255, 120, 120))
+    screen.blit(text, (code_rect.x + 10, code_rect.bottom - 55))
+
 def draw_run_button():
     button_rect = pygame.Rect(SCREEN_WIDTH - 140, 20, 120, 40)
     pygame.draw.rect(screen, (30, 120, 30), button_rect)
     pygame.draw.rect(screen, (255, 255, 255), button_rect, 2)
-    text = font.render("▶ Run Code", True, (255, 255, 255))
+    text = font.render("⏳ Running" if pending_verdict else "▶ Run Code", True, (255, 255, 255))
     screen.blit(text, (button_rect.x + 10, button_rect.y + 8))
     return button_rect
 
 def check_challenge_answer():
-    global output_message, challenge_solved, show_congrats, code_lines
-    code = "\n".join(code_lines)
-    namespace = {}
-    try:
-        with contextlib.redirect_stdout(io.StringIO()):
-            exec(code, {}, namespace)
-
-        if active_npc["name"] == "Old Man Cedric":
-            rune = namespace.get("rune", None)
-            if rune == "single":
-                output_message = "✅ Correct!"
-                challenge_solved = True
-                show_congrats = True
-            else:
-                output_message = "❌ Try again. Make sure 'rune' is correct."
-        elif active_npc["name"] == "Bugsy the Apprentice":
-            output = io.StringIO()
-            with contextlib.redirect_stdout(output):
-                exec(code, {}, {})
-            result = output.getvalue().strip().splitlines()
-            if result == [str(i) for i in range(1, 11)]:
-                output_message = "✅ Correct!"
-                challenge_solved = True
-                show_congrats = True
-            else:
-                output_message = "❌ That doesn't include 10."
-        elif active_npc["name"] == "Torchbearer Korr":
-            func = namespace.get("add", None)
-            if callable(func) and func(2, 3) == 5 and func(-1, 1) == 0:
-                output_message = "✅ Correct!"
-                challenge_solved = True
-                show_congrats = True
-            else:
-                output_message = "❌ Check your 'add' function."
-    except Exception as e:
-        output_message = f"⚠️ Error: {e}"
-
-    # Provide starter code when entering the challenge
-    if active_npc["name"] == "Old Man Cedric":
-        code_lines = ["rune = 'elgnis'"]
-    elif active_npc["name"] == "Bugsy the Apprentice":
-        code_lines = ["for i in range(1, 10):", "    print(i)"]
-    elif active_npc["name"] == "Torchbearer Korr":
-        code_lines = ["def add(a, b):", "    return a - b"]
+    global output_message, pending_verdict
+    if pending_verdict:
+        return
+    name = active_npc["name"]
+    future = grader_pool.submit(name, "\n".join(code_lines))
+    deadline = pygame.time.get_ticks() + (grader_pool.timeout_for(name) + KILL_GRACE) * 1000 + verdict_slack_ms
+    pending_verdict = (name, len(code_lines), future, deadline)
+    output_message = "⏳ Running your code..."
+
+def poll_verdict():
+    # Efficiency challenges benchmark the player's code for a few seconds, so the
+    # game keeps running and picks the verdict up when the worker answers
+    global output_message, challenge_solved, show_congrats, pending_verdict
+    if not pending_verdict:
+        return
+    name, lines, future, deadline = pending_verdict
+    if future.done():
+        result = future.result()
+    elif pygame.time.get_ticks() > deadline:
+        # The grader never answered; give the Run button back rather than wait forever
+        future.cancel()
+        result = {"solved": False, "message": "⚠️ Error: the grader did not respond, try again", "ms": 0.0}
+    else:
+        return
+    pending_verdict = None
+    solved = result["solved"]
+    telemetry.record("run", npc=name, solved=solved, lines=lines, ms=round(result["ms"], 1),
+                     error=None if solved else result["message"])
+    if solved:
+        solved_challenges.add(name)
+        autosaver.save(capture_state())
+    if active_npc is None or active_npc["name"] != name:
+        return  # the player already left; the solve still counts
+    output_message = result["message"]
+    if solved:
+        challenge_solved = True
+        show_congrats = True
+        celebrate()
+
+def record_challenge_close():
+    telemetry.record("challenge_close", npc=active_npc["name"], solved=active_npc["name"] in solved_challenges,
+                     seconds=(pygame.time.get_ticks() - challenge_started_ms) / 1000)
 
 def draw_dialogue_box():
     box_height = 120
     pygame.draw.rect(screen, (30, 30, 30), (50, SCREEN_HEIGHT - box_height - 50, SCREEN_WIDTH - 100, box_height))
     pygame.draw.rect(screen, (255, 255, 255), (50, SCREEN_HEIGHT - box_height - 50, SCREEN_WIDTH - 100, box_height), 2)
-    if dialogue_index < len(dialogue_lines):
-        line = dialogue_lines[dialogue_index]
-        rendered = font.render(line, True, (255, 255, 255))
-        screen.blit(rendered, (70, SCREEN_HEIGHT - box_height - 20))
+    if dialogue_index < len(dialogue_pages):
+        screen.blit(dialogue_pages[dialogue_index], dialogue_text_rect.topleft)
 
 def draw_challenge_screen():
     padding = 20
@@ -433,11 +507,11 @@ def draw_challenge_screen():
     prompt_rect = pygame.Rect(padding, box_top, box_width, box_height)
     pygame.draw.rect(screen, (40, 40, 40), prompt_rect)
     pygame.draw.rect(screen, (255, 255, 255), prompt_rect, 2)
-    y = box_top + 10
-    for line in challenge_prompt:
-        rendered = font.render(line, True, (255, 255, 255))
-        screen.blit(rendered, (prompt_rect.x + 10, y))
-        y += 28
+    if prompt_page < len(prompt_pages):
+        screen.blit(prompt_pages[prompt_page], (prompt_rect.x + 10, box_top + 10))
+    if len(prompt_pages) > 1:
+        page_text = hint_font.render(f"Page {prompt_page + 1}/{len(prompt_pages)} (PgUp/PgDn)", True, (180, 180, 180))
+        screen.blit(page_text, (prompt_rect.x + 10, prompt_rect.bottom - page_text.get_height() - 8))
 
     code_rect = pygame.Rect(padding * 2 + box_width, box_top, box_width, box_height)
     pygame.draw.rect(screen, (20, 20, 20), code_rect)
@@ -451,6 +525,7 @@ def draw_challenge_screen():
         cursor_x = code_rect.x + 10 + text_before_cursor.get_width()
         cursor_y = code_rect.y + 10 + cursor_line * line_height
         pygame.draw.line(screen, (0, 255, 0), (cursor_x, cursor_y), (cursor_x, cursor_y + line_height - 4), 2)
+    draw_syntax_marker(code_rect, line_height)
 
     # Exit hint
     exit_text = font.render("Press ESC to exit", True, (180, 180, 180))
@@ -493,6 +568,7 @@ npcs = [
     },
     {
         "x": 53, "y": 19,
+        "patrol": [(53, 19), (57, 23)],
         "name": "Bugsy the Apprentice",
         "dialogue": [
             "Bugsy: Oh no, not again...",
@@ -524,41 +600,333 @@ npcs = [
             "But they meant for it to **add** the two numbers.",
             "Your task: Fix the function so it returns the correct sum."
         ]
+    },
+    {
+        "x": 36, "y": 12,
+        "name": "Archivist Vell",
+        "dialogue": [
+            "Archivist Vell: Thousands of scrolls, and somewhere a copy hides among them.",
+            "Archivist Vell: My checker compares every scroll with every other one.",
+            "Archivist Vell: It was fine for ten scrolls. It will not finish for ten thousand."
+        ],
+        "challenge_prompt": [
+            "The Endless Archive",
+            "has_duplicate(items) should return True if any item appears twice, otherwise False.",
+            "Vell's version is correct but compares every pair.",
+            "Your task: make it fast. It is timed on up to 8000 scrolls and must grow no faster than O(n)."
+        ]
     }
 ]
 
+# === NPC patrols
+npc_step_ms = 350
+
+def update_npcs(dt):
+    for npc in npcs:
+        if "patrol" not in npc:
+            continue
+        npc["step_timer"] = npc.get("step_timer", 0) + dt
+        if npc["step_timer"] < npc_step_ms:
+            continue
+        npc["step_timer"] = 0
+        if not npc.get("path"):
+            npc["patrol_index"] = (npc.get("patrol_index", 0) + 1) % len(npc["patrol"])
+            goal = npc["patrol"][npc["patrol_index"]]
+            npc["path"] = (pathfinder.find_path((npc["x"], npc["y"]), goal) or [])[1:]
+        if npc["path"]:
+            npc["x"], npc["y"] = npc["path"].pop(0)
+
+# === Critters (wandering entities in the SoA store)
+critter_size = 8
+critter_speed = 40  # pixels per second
+critter_max_step_ms = 50  # longer frames are simulated as this long, so critters can't skip walls
+critter_colors = [(250, 230, 120), (240, 240, 255), (200, 160, 255)]
+rng = np.random.default_rng()
+entities = EntityStore()
+spawn_on_walkable(entities, rng, collision_grid, tile_width, tile_height, 24, critter_size, critter_size)
+entities.sprite[:entities.count] = rng.integers(0, len(critter_colors), entities.count)
+
+def update_entities(dt):
+    hit = entities.integrate(min(dt, critter_max_step_ms) / 1000, collision_grid, tile_width, tile_height)
+    entities.wander(rng, critter_speed, 0.02, hit)
+
+# === Sprites (depth-sorted with the tree and building overhangs)
+player_sprite = sprite_layer.add(solid_sprite(player_color, (player_size, player_size)), 0, 0, 0)
+npc_sprites = [sprite_layer.add(solid_sprite(npc_color, (npc_size, npc_size)), 0, 0, 0) for npc in npcs]
+critter_sprites = [
+    sprite_layer.add(solid_sprite(critter_colors[entities.sprite[i]], entities.size[i].astype(int)), 0, 0, 0)
+    for i in range(entities.count)
+]
+
+def sync_sprites():
+    # Depth is the bottom edge (feet); only sprites that change row switch buckets
+    for i, sprite_id in enumerate(critter_sprites):
+        x, y = entities.pos[i].astype(int).tolist()
+        sprite_layer.move(sprite_id, x, y, y + int(entities.size[i][1]))
+    for npc, sprite_id in zip(npcs, npc_sprites):
+        x, y = npc["x"] * tile_width, npc["y"] * tile_height
+        sprite_layer.move(sprite_id, x, y, y + npc_size)
+    sprite_layer.move(player_sprite, player_pos[0], player_pos[1], player_pos[1] + player_size)
+
+# === Particles (confetti on a solve, campfire sparks, water splashes)
+confetti = ParticleSystem(CONFETTI, capacity=2048, size=5, gravity=260, drag=0.6)
+sparks = ParticleSystem(SPARKS, capacity=4096, size=2, gravity=-40, drag=0.8)
+splashes = ParticleSystem(SPLASH, capacity=2048, size=2, gravity=220)
+sparks_per_fire = 12    # per second
+splash_chance = 0.02    # per visible water tile per second
+
+def find_effect_tiles():
+    # Tile coordinates of campfires and water, rescanned when tiles change
+    global campfire_tiles, water_tiles
+    fire_gids = [gid for gid, light in light_gids(tilesets).items() if light == CAMPFIRE]
+    water_gids = [ts["firstgid"] + i for ts in tilesets if ts["name"] == "Tileset_Water" for i in range(ts["tilecount"])]
+    grids = [layer_grid(map_data, layer) for layer in tile_layers(map_data)]
+    campfire_tiles = np.argwhere(np.any([np.isin(g, fire_gids) for g in grids], axis=0))[:, ::-1]
+    water_tiles = np.argwhere(np.any([np.isin(g, water_gids) for g in grids], axis=0))[:, ::-1]
+
+find_effect_tiles()
+
+def visible_tiles(tiles, camera_offset):
+    view_width, view_height = world.get_size()
+    x0, y0 = camera_offset[0] // tile_width - 1, camera_offset[1] // tile_height - 1
+    x1, y1 = (camera_offset[0] + view_width) // tile_width + 1, (camera_offset[1] + view_height) // tile_height + 1
+    return tiles[(tiles[:, 0] >= x0) & (tiles[:, 0] <= x1) & (tiles[:, 1] >= y0) & (tiles[:, 1] <= y1)]
+
+def update_effects(dt, camera_offset):
+    seconds = dt / 1000
+    fires = visible_tiles(campfire_tiles, camera_offset)
+    if len(fires):
+        fires = np.repeat(fires, rng.poisson(sparks_per_fire * seconds, len(fires)), axis=0)
+        sparks.emit(len(fires), (fires[:, 0] + 0.5) * tile_width, (fires[:, 1] + 0.4) * tile_height,
+                    speed=(20, 60), angle=(-2.1, -1.0), life=(0.6, 1.4), spread=4)
+    water = visible_tiles(water_tiles, camera_offset)
+    if len(water):
+        water = np.repeat(water[rng.random(len(water)) < splash_chance * seconds], 6, axis=0)
+        splashes.emit(len(water), (water[:, 0] + 0.5) * tile_width, (water[:, 1] + 0.5) * tile_height,
+                      speed=(30, 70), angle=(-2.6, -0.5), life=(0.3, 0.6), spread=3)
+    sparks.update(seconds)
+    splashes.update(seconds)
+
+def celebrate():
+    # Confetti burst from the congrats popup
+    confetti.emit(400, SCREEN_WIDTH // 2, 360, speed=(200, 480), angle=(-2.8, -0.35), life=(1.5, 2.5), spread=60)
+
+# === Save / load
+autosave_interval_ms = 30000
+autosave_timer = 0
+autosaver = Autosaver()
+saved_snapshot = None
+# Chunks whose tiles differ from the map file. Only restored chunks land here for
+# now: nothing in play edits tiles yet, so tile-editing features mark their chunks here
+dirty_chunks = set()
+pending_chunks = set()  # chunks in saved_snapshot that haven't been restored yet
+
+def refresh_collision(x0, y0, x1, y1):
+    for x, y, solid in update_collision_region(collision_grid, map_data, collidable_gids, x0, y0, x1, y1):
+        pathfinder.set_walkable(x, y, not solid)
+
+def capture_state():
+    # Cheap copy of the live state; encoding and disk I/O happen on the autosave thread
+    chunks = {key: saved_snapshot.chunk_blob(*key) for key in pending_chunks}
+    for cx, cy in dirty_chunks:
+        chunks[(cx, cy)] = pack_chunk(map_data, cx, cy)
+    return {
+        "player": tuple(player_pos),
+        "track": current_track,
+        "solved": set(solved_challenges),
+        "npcs": [(npc["name"], npc["x"], npc["y"], npc.get("patrol_index", 0)) for npc in npcs],
+        "chunks": chunks,
+    }
+
+def load_game():
+    global saved_snapshot, current_track
+    if not os.path.exists(AUTOSAVE_FILE):
+        return
+    try:
+        snapshot = Snapshot.open(AUTOSAVE_FILE)
+    except (OSError, ValueError, struct.error) as e:
+        print(f"Could not load save: {e}")
+        return
+    if snapshot.chunk_size != CHUNK_SIZE:
+        print(f"Could not load save: chunk size {snapshot.chunk_size} != {CHUNK_SIZE}")
+        return
+    player_pos[:] = snapshot.player
+    current_track = snapshot.track % len(music_playlist)
+    solved_challenges.update(snapshot.solved)
+    for npc in npcs:
+        if npc["name"] in snapshot.npcs:
+            npc["x"], npc["y"], patrol_index = snapshot.npcs[npc["name"]]
+            if "patrol" in npc:
+                npc["patrol_index"] = patrol_index
+    saved_snapshot = snapshot
+    pending_chunks.update(snapshot.chunk_index)
+
+def restore_chunk(key):
+    pending_chunks.discard(key)
+    try:
+        x0, y0, gids = unpack_chunk(map_data, saved_snapshot.chunk_blob(*key), *key)
+        if gids.shape[0] != len(tile_layers(map_data)):
+            raise ValueError(f"{gids.shape[0]} layers, the map has {len(tile_layers(map_data))}")
+    except (zlib.error, ValueError) as e:
+        # Corrupt or from a different map: keep the map file's tiles for this chunk
+        print(f"Could not load saved chunk {key}: {e}")
+        return
+    for layer, layer_gids in zip(tile_layers(map_data), gids):
+        for row, values in enumerate(layer_gids.tolist()):
+            start = (y0 + row) * map_width + x0
+            layer["data"][start:start + len(values)] = values
+    refresh_collision(x0, y0, x0 + gids.shape[2], y0 + gids.shape[1])
+    lighting.rebake_tiles(x0, y0, x0 + gids.shape[2], y0 + gids.shape[1])
+    map_renderer.invalidate_tiles(x0, y0, x0 + gids.shape[2], y0 + gids.shape[1])
+    minimap.update_tiles(x0, y0, x0 + gids.shape[2], y0 + gids.shape[1])
+    tilesets_changed = sync_tileset_usage()
+    find_effect_tiles()
+    # Newly loaded or released atlases change overhang images anywhere on the map
+    refresh_overhangs(None if tilesets_changed else (x0, y0, x0 + gids.shape[2], y0 + gids.shape[1]))
+    dirty_chunks.add(key)
+
+def restore_nearby_chunks(camera_offset):
+    # Saved world chunks are only decoded once they come near the viewport
+    if not pending_chunks:
+        return
+    chunk_w = tile_width * CHUNK_SIZE
+    chunk_h = tile_height * CHUNK_SIZE
+    view_width, view_height = world.get_size()
+    for cy in range(camera_offset[1] // chunk_h - 1, (camera_offset[1] + view_height) // chunk_h + 2):
+        for cx in range(camera_offset[0] // chunk_w - 1, (camera_offset[0] + view_width) // chunk_w + 2):
+            if (cx, cy) in pending_chunks:
+                restore_chunk((cx, cy))
+
+# === Hot reload (HOC_HOT_RELOAD=1)
+def apply_tile_changes(regions, old_grids, new_grids):
+    # Copy only the tiles the designer changed, leaving tiles restored from a save alone
+    for x0, y0, x1, y1 in regions:
+        for index, layer in enumerate(tile_layers(map_data)):
+            old, new = old_grids[index, y0:y1, x0:x1], new_grids[index, y0:y1, x0:x1]
+            for y, x in np.argwhere(old != new):
+                layer["data"][(y0 + y) * map_width + x0 + x] = int(new[y, x])
+        refresh_collision(x0, y0, x1, y1)
+        lighting.rebake_tiles(x0, y0, x1, y1)
+        map_renderer.invalidate_tiles(x0, y0, x1, y1)
+        minimap.update_tiles(x0, y0, x1, y1)
+    tilesets_changed = sync_tileset_usage()
+    find_effect_tiles()
+    if tilesets_changed:
+        refresh_overhangs()
+    else:
+        for region in regions:
+            refresh_overhangs(region)
+
+def apply_tileset_changes(indices):
+    reloaded = 0
+    for index in indices:
+        old = tilesets[index]
+        try:
+            tilesets[index] = load_tileset(map_data["tilesets"][index], old["image"] is not None, reload=True)
+        except (OSError, pygame.error, ET.ParseError) as e:
+            # Probably caught mid-save; try again on the next poll
+            print(f"Hot reload: could not load tileset {index}: {e}")
+            for path in hot_reloader.tileset_files[index]:
+                hot_reloader.watcher.retry(path)
+            continue
+        release_tileset(old)
+        reloaded += 1
+    if not reloaded:
+        return
+    collidable_gids.clear()
+    collidable_gids.update(tileset_collidable_gids(tilesets))
+    new_grid = build_collision_grid(map_data, collidable_gids)
+    for y, x in np.argwhere(new_grid != collision_grid):
+        pathfinder.set_walkable(x, y, not new_grid[y, x])
+    collision_grid[:] = new_grid
+
+    gid_lights = light_gids(tilesets)
+    if gid_lights != lighting.gid_lights:
+        lighting.gid_lights = gid_lights
+        lighting.rebake_tiles(0, 0, map_width, map_height)
+    map_renderer.set_tilesets(tilesets)
+    minimap.set_tilesets(tilesets)
+    refresh_overhangs()
+
+def check_hot_reload(dt):
+    change = hot_reloader.poll(dt)
+    if not change:
+        return
+    if change["tilesets"]:
+        apply_tileset_changes(change["tilesets"])
+    if change["tiles"]:
+        apply_tile_changes(change["tiles"], change["old"], change["new"])
+    print(f"Hot reload: {len(change['tiles'])} region(s), {len(change['tilesets'])} tileset(s)")
+
 # === Font
-font = pygame.font.SysFont(None, 28)
+font = fonts.get(None, 28)
+pause_font = fonts.get("consolas", 36)
+hint_font = fonts.get("consolas", 18)
+
+# === Text layout (word-wrapped, paginated dialogue and prompts)
+text_layout = TextLayout()
+text_line_height = 28
+dialogue_text_rect = pygame.Rect(70, SCREEN_HEIGHT - 155, SCREEN_WIDTH - 140, 90)
+# Inner area of the challenge prompt box, less a row for the page hint
+prompt_text_size = ((SCREEN_WIDTH - 60) // 2 - 20, SCREEN_HEIGHT // 2 - 20 - text_line_height)
+prepare_radius = 6  # tiles from an NPC at which their text is laid out ahead of time
+
+def layout_dialogue(npc):
+    # One or more pages per authored line, so every speaker switch starts a new page
+    return [page for line in npc["dialogue"]
+            for page in text_layout.pages(line, font, *dialogue_text_rect.size, line_height=text_line_height)]
+
+def layout_prompt(npc):
+    return text_layout.pages(npc["challenge_prompt"], font, *prompt_text_size, line_height=text_line_height)
+
+def prepare_nearby_text():
+    # Queue the text of NPCs the player is walking up to, then lay out a little of the queue
+    px, py = player_pos[0] // tile_width, player_pos[1] // tile_height
+    for npc in npcs:
+        if abs(npc["x"] - px) + abs(npc["y"] - py) <= prepare_radius:
+            for line in npc["dialogue"]:
+                text_layout.prepare(line, font, *dialogue_text_rect.size, line_height=text_line_height)
+            text_layout.prepare(npc["challenge_prompt"], font, *prompt_text_size, line_height=text_line_height)
+    text_layout.pump()
 
 # === Main loop
 start_screen()
 show_intro()
+load_game()
+telemetry.record("session_start", player=tuple(player_pos), solved=sorted(solved_challenges))
 play_music(current_track)
 
 running = True
+slow_frame_ms = 50
+clock.tick()  # so the first frame's dt doesn't include the start screen and intro
 
 while running:
     dt = clock.tick(60)
-    screen.fill((0, 0, 0))
+    if dt > slow_frame_ms:
+        telemetry.record("slow_frame", ms=dt, scene=scene)
+    view_width, view_height = world.get_size()
 
-    cam_x = player_pos[0] - SCREEN_WIDTH // 2 + player_size // 2
-    cam_y = player_pos[1] - SCREEN_HEIGHT // 2 + player_size // 2
+    cam_x = player_pos[0] - view_width // 2 + player_size // 2
+    cam_y = player_pos[1] - view_height // 2 + player_size // 2
 
     # Get map pixel size
     map_pixel_width = map_width * tile_width
     map_pixel_height = map_height * tile_height
 
-    cam_x = max(0, min(cam_x, map_pixel_width - SCREEN_WIDTH))
-    cam_y = max(0, min(cam_y, map_pixel_height - SCREEN_HEIGHT))
+    cam_x = max(0, min(cam_x, map_pixel_width - view_width))
+    cam_y = max(0, min(cam_y, map_pixel_height - view_height))
 
     camera_offset = (cam_x, cam_y)
 
-    draw_map(camera_offset)
+    if hot_reloader:
+        check_hot_reload(dt)
+    restore_nearby_chunks(camera_offset)
+    map_renderer.draw(world, camera_offset)
 
-    for npc in npcs:
-        screen_x = npc["x"] * tile_width - camera_offset[0]
-        screen_y = npc["y"] * tile_height - camera_offset[1]
-        pygame.draw.rect(screen, npc_color, (screen_x, screen_y, npc_size, npc_size))
+    pathfinder.warm_up()  # links map clusters a millisecond at a time after load
+    if scene == "map":
+        update_npcs(dt)
+        update_entities(dt)
 
     old_pos = player_pos[:]
     keys = pygame.key.get_pressed()
@@ -573,18 +941,26 @@ while running:
     player_pos[0] = max(0, min(player_pos[0], map_width * tile_width - player_size))
     player_pos[1] = max(0, min(player_pos[1], map_height * tile_height - player_size))
 
-    # --- Draw player
-    player_screen_x = player_pos[0] - camera_offset[0]
-    player_screen_y = player_pos[1] - camera_offset[1]
+    # --- Draw player, NPCs and critters in depth order with the overhangs
+    sync_sprites()
+    sprite_layer.draw(world, camera_offset)
 
-    pygame.draw.rect(screen, player_color, (player_screen_x, player_screen_y, player_size, player_size))
+    if scene == "map":
+        update_effects(dt, camera_offset)
+    sparks.draw(world, camera_offset)
+    splashes.draw(world, camera_offset)
+
+    lighting.reveal(player_pos[0] // tile_width, player_pos[1] // tile_height)
+    lighting.draw(world, camera_offset, (player_pos[0] + player_size // 2, player_pos[1] + player_size // 2))
+    render_target.present()
 
     if scene == "map":
+        prepare_nearby_text()
         player_tile = (player_pos[0] // tile_width, player_pos[1] // tile_height)
         for npc in npcs:
             if player_tile == (npc["x"], npc["y"]):
                 active_npc = npc
-                dialogue_lines = npc["dialogue"]
+                dialogue_pages = layout_dialogue(npc)
                 dialogue_index = 0
                 scene = "dialogue"
                 break
@@ -596,33 +972,43 @@ while running:
             current_track = (current_track + 1) % len(music_playlist)
             play_music(current_track)
 
+        elif scene == "map" and event.type == pygame.KEYDOWN and event.key == pygame.K_l:
+            lighting.enabled = not lighting.enabled
+        elif scene == "map" and event.type == pygame.KEYDOWN and event.key == pygame.K_F2:
+            render_target.cycle()
+            world = render_target.surface
+        elif scene == "map" and event.type == pygame.KEYDOWN and event.key == pygame.K_m:
+            minimap.enabled = not minimap.enabled
+        elif scene == "map" and event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+            print(asset_manager.report())
+
         elif scene == "dialogue" and event.type == pygame.KEYDOWN:
             if event.key == pygame.K_SPACE:
                 dialogue_index += 1
-                if dialogue_index >= len(dialogue_lines):
-                    challenge_prompt = active_npc["challenge_prompt"]
-                    if active_npc["name"] == "Old Man Cedric":
-                        code_lines = ["rune = 'elgnis'"]
-                    elif active_npc["name"] == "Bugsy the Apprentice":
-                        code_lines = ["for i in range(1, 10):", "    print(i)"]
-                    elif active_npc["name"] == "Torchbearer Korr":
-                        code_lines = ["def add(a, b):", "    return a - b"]
-                    else:
-                        code_lines = [""]
+                if dialogue_index >= len(dialogue_pages):
+                    prompt_pages = layout_prompt(active_npc)
+                    prompt_page = 0
+                    code_lines = starter_code(active_npc["name"])
                     cursor_line = 0
                     output_message = ""
                     cursor_col = 0
                     scene = "challenge"
+                    syntax_checker.submit(code_lines)
+                    challenge_started_ms = pygame.time.get_ticks()
+                    telemetry.record("challenge_open", npc=active_npc["name"])
         elif scene == "challenge" and event.type == pygame.KEYDOWN:
             if event.key == pygame.K_ESCAPE:
+                record_challenge_close()
                 scene = "map"
                 active_npc = None
+                syntax_checker.cancel()
                 player_pos[0] += 20
                 player_pos[1] += 20
             elif event.key == pygame.K_RETURN:
                 code_lines.insert(cursor_line + 1, "")
                 cursor_line += 1
                 cursor_col = 0
+                syntax_checker.submit(code_lines)
             elif event.key == pygame.K_BACKSPACE:
                 if cursor_col > 0:
                     code_lines[cursor_line] = (
@@ -635,6 +1021,7 @@ while running:
                     code_lines[cursor_line - 1] += code_lines[cursor_line]
                     del code_lines[cursor_line]
                     cursor_line -= 1
+                syntax_checker.submit(code_lines)
             elif event.key == pygame.K_LEFT:
                 if cursor_col > 0:
                     cursor_col -= 1
@@ -649,6 +1036,9 @@ while running:
                 if cursor_line < len(code_lines) - 1:
                     cursor_line += 1
                     cursor_col = min(cursor_col, len(code_lines[cursor_line]))
+            elif event.key in (pygame.K_PAGEUP, pygame.K_PAGEDOWN):
+                step = 1 if event.key == pygame.K_PAGEDOWN else -1
+                prompt_page = max(0, min(prompt_page + step, len(prompt_pages) - 1))
             else:
                 char = event.unicode
                 if char.isprintable():
@@ -656,23 +1046,42 @@ while running:
                         code_lines[cursor_line][:cursor_col] + char + code_lines[cursor_line][cursor_col:]
                     )
                     cursor_col += 1
+                    syntax_checker.submit(code_lines)
         elif event.type == pygame.MOUSEBUTTONDOWN and scene == "challenge":
             if run_button_rect.collidepoint(event.pos):
                 check_challenge_answer()
             if show_congrats and continue_button_rect.collidepoint(event.pos):
                 show_congrats = False
+                confetti.clear()
+                record_challenge_close()
                 scene = "map"
                 active_npc = None
+                syntax_checker.cancel()
                 player_pos[0] += 20
                 player_pos[1] += 20
 
+    poll_verdict()
     cursor_visible = (pygame.time.get_ticks() // 500) % 2 == 0
 
-    if scene == "dialogue":
+    autosave_timer += dt
+    if autosave_timer >= autosave_interval_ms or not running:
+        autosave_timer = 0
+        autosaver.save(capture_state())
+
+    if scene == "map":
+        minimap.draw(screen, player_pos, [(npc["x"], npc["y"]) for npc in npcs],
+                     (*camera_offset, view_width, view_height), lighting.fog if lighting.enabled else None)
+    elif scene == "dialogue":
         draw_dialogue_box()
     elif scene == "challenge":
         draw_challenge_screen()
+        confetti.update(dt / 1000)
+        confetti.draw(screen)
 
     pygame.display.flip()
 
+autosaver.stop()
+grader_pool.close()
+telemetry.record("session_end", solved=sorted(solved_challenges))
+telemetry.stop()
 pygame.quit()
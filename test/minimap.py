@@ -0,0 +1,112 @@
+import numpy as np
+import pygame
+
+# === Minimap
+# Each gid gets one precomputed colour (alpha-weighted average of its atlas
+# tile) and a coverage value (mean alpha). The map image is then built with
+# NumPy fancy indexing: colours[gids] per layer, blended bottom to top by
+# coverage, one pixel per tile, written through pygame.surfarray. Changed tiles
+# only recompute their rectangle. Markers are a few rects drawn per frame.
+
+MINIMAP_SCALE = 3  # screen pixels per tile
+MARGIN = 10
+PLAYER_MARKER = (255, 60, 60)
+NPC_MARKER = (255, 230, 80)
+VIEW_MARKER = (255, 255, 255)
+
+
+def atlas_colors(image, columns, tile_width, tile_height):
+    # Per local tile id: alpha-weighted mean colour (n, 3) and coverage (n,)
+    rows = image.get_height() // tile_height
+    width, height = columns * tile_width, rows * tile_height
+    rgb = pygame.surfarray.array3d(image)[:width, :height].astype(np.float32)
+    alpha = pygame.surfarray.array_alpha(image)[:width, :height].astype(np.float32) / 255
+    # (x, y) -> (col, tile x, row, tile y), then sum each tile's pixels
+    rgb = rgb.reshape(columns, tile_width, rows, tile_height, 3)
+    alpha = alpha.reshape(columns, tile_width, rows, tile_height)
+    weight = alpha.sum(axis=(1, 3))
+    mean = (rgb * alpha[..., None]).sum(axis=(1, 3)) / np.maximum(weight, 1e-6)[..., None]
+    # Local tile ids run row by row, so put rows first before flattening
+    return mean.transpose(1, 0, 2).reshape(-1, 3), (weight / (tile_width * tile_height)).T.reshape(-1)
+
+
+def gid_colors(tilesets, tile_width, tile_height, cache=None):
+    # (colours (n, 3) float32, coverage (n,) float32), indexed by gid; gid 0 is empty.
+    # cache maps atlas surface -> atlas_colors(), so unchanged atlases aren't re-averaged.
+    cache = {} if cache is None else cache
+    loaded = [ts for ts in tilesets if ts["image"] is not None]
+    last = max((ts["firstgid"] + ts["columns"] * (ts["image"].get_height() // tile_height) for ts in loaded), default=1)
+    colors = np.zeros((last, 3), dtype=np.float32)
+    coverage = np.zeros(last, dtype=np.float32)
+    for ts in loaded:
+        if ts["image"] not in cache:
+            cache[ts["image"]] = atlas_colors(ts["image"], ts["columns"], tile_width, tile_height)
+        tile_colors, tile_coverage = cache[ts["image"]]
+        first = ts["firstgid"]
+        count = min(len(tile_colors), last - first)
+        colors[first:first + count] = tile_colors[:count]
+        coverage[first:first + count] = tile_coverage[:count]
+    return colors, coverage
+
+
+class Minimap:
+    def __init__(self, map_data, tilesets, scale=MINIMAP_SCALE):
+        self.map_data = map_data
+        self.tile_width = map_data["tilewidth"]
+        self.tile_height = map_data["tileheight"]
+        self.width = map_data["width"]
+        self.height = map_data["height"]
+        self.scale = scale
+        self.layers = [layer["data"] for layer in map_data["layers"] if layer["type"] == "tilelayer"]
+        self.enabled = True
+        self.tiles = pygame.Surface((self.width, self.height))
+        self.image = pygame.Surface((self.width * scale, self.height * scale))
+        self.atlas_cache = {}
+        self.set_tilesets(tilesets)
+
+    def set_tilesets(self, tilesets):
+        # Only atlases that are still loaded stay in the cache
+        self.atlas_cache = {ts["image"]: self.atlas_cache[ts["image"]] for ts in tilesets
+                            if ts["image"] is not None and ts["image"] in self.atlas_cache}
+        self.colors, self.coverage = gid_colors(tilesets, self.tile_width, self.tile_height, self.atlas_cache)
+        self.update_tiles(0, 0, self.width, self.height)
+
+    def update_tiles(self, x0, y0, x1, y1):
+        # Recolour a rectangle of tiles from the live layer data
+        rgb = np.zeros((y1 - y0, x1 - x0, 3), dtype=np.float32)
+        for data in self.layers:
+            gids = np.array([data[y * self.width + x0:y * self.width + x1] for y in range(y0, y1)], dtype=np.int64)
+            gids = np.where(gids < len(self.colors), gids, 0)
+            alpha = self.coverage[gids][..., None]
+            rgb = rgb * (1 - alpha) + self.colors[gids] * alpha
+        pixels = pygame.surfarray.pixels3d(self.tiles)
+        pixels[x0:x1, y0:y1] = rgb.transpose(1, 0, 2).astype(np.uint8)
+        del pixels
+        s = self.scale
+        region = pygame.Rect(x0, y0, x1 - x0, y1 - y0)
+        scaled = pygame.transform.scale(self.tiles.subsurface(region), (region.width * s, region.height * s))
+        self.image.blit(scaled, (x0 * s, y0 * s))
+
+    def draw(self, target, player_pos, npcs=(), view=None, fog=None):
+        if not self.enabled:
+            return
+        s = self.scale
+        origin = (target.get_width() - self.image.get_width() - MARGIN, MARGIN)
+        frame = pygame.Rect(origin, self.image.get_size())
+        target.blit(self.image, origin)
+        if fog is not None:
+            # Unvisited tiles stay dark, matching the fog of war in the world view
+            target.blit(pygame.transform.scale(fog, frame.size), origin, special_flags=pygame.BLEND_MULT)
+        pygame.draw.rect(target, (0, 0, 0), frame.inflate(4, 4), 2)
+
+        if view:
+            cam_x, cam_y, view_w, view_h = view
+            pygame.draw.rect(target, VIEW_MARKER, (
+                origin[0] + cam_x * s // self.tile_width, origin[1] + cam_y * s // self.tile_height,
+                view_w * s // self.tile_width, view_h * s // self.tile_height,
+            ), 1)
+        for x, y in npcs:
+            target.fill(NPC_MARKER, (origin[0] + x * s - 1, origin[1] + y * s - 1, s + 2, s + 2))
+        px = origin[0] + player_pos[0] * s // self.tile_width
+        py = origin[1] + player_pos[1] * s // self.tile_height
+        target.fill(PLAYER_MARKER, (px - 2, py - 2, s + 3, s + 3))
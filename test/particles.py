@@ -0,0 +1,107 @@
+import numpy as np
+import pygame
+
+# === Pooled particle system
+# All particle state lives in preallocated NumPy arrays; a particle is just a
+# slot index. Free slots sit on an int stack, so emitting pops a block of
+# indices and dying pushes them back, with no per-particle Python objects.
+# update() steps every live particle in one vectorized batch. draw() picks a
+# cached, pre-tinted sprite per particle (colour x fade step) and hands the lot
+# to a single Surface.blits() call.
+
+FADE_STEPS = 4
+
+CONFETTI = [(255, 80, 80), (255, 210, 60), (80, 200, 255), (120, 255, 120), (230, 120, 255)]
+SPARKS = [(255, 220, 120), (255, 160, 60), (255, 100, 30)]
+SPLASH = [(200, 235, 255), (150, 210, 250)]
+
+
+def tinted_sprites(colors, size):
+    # sprites[color * FADE_STEPS + step], step 0 fully opaque
+    sprites = np.empty(len(colors) * FADE_STEPS, dtype=object)
+    for c, color in enumerate(colors):
+        for step in range(FADE_STEPS):
+            sprite = pygame.Surface((size, size)).convert()
+            sprite.fill(color)
+            sprite.set_alpha(255 - step * 255 // FADE_STEPS)
+            sprites[c * FADE_STEPS + step] = sprite
+    return sprites
+
+
+class ParticleSystem:
+    def __init__(self, colors, capacity=8192, size=3, gravity=0.0, drag=0.0):
+        self.capacity = capacity
+        self.gravity = gravity  # pixels/s^2, positive is down
+        self.drag = drag        # fraction of velocity lost per second
+        self.sprites = tinted_sprites(colors, size)
+        self.colors = len(colors)
+        self.pos = np.zeros((capacity, 2), dtype=np.float32)
+        self.vel = np.zeros((capacity, 2), dtype=np.float32)
+        self.life = np.zeros(capacity, dtype=np.float32)
+        self.max_life = np.ones(capacity, dtype=np.float32)
+        self.color = np.zeros(capacity, dtype=np.int16)
+        self.alive = np.zeros(capacity, dtype=bool)
+        self.free = np.arange(capacity - 1, -1, -1, dtype=np.int32)
+        self.free_count = capacity
+        self.rng = np.random.default_rng()
+
+    @property
+    def count(self):
+        return self.capacity - self.free_count
+
+    def emit(self, n, x, y, speed=(40, 120), angle=(0, 2 * np.pi), life=(0.5, 1.5), spread=0.0):
+        # x, y may be scalars or arrays of n emitter positions; returns how many fit in the pool
+        wanted, n = n, min(n, self.free_count)
+        if n <= 0:
+            return 0
+        x = np.broadcast_to(x, wanted)[:n]
+        y = np.broadcast_to(y, wanted)[:n]
+        self.free_count -= n
+        idx = self.free[self.free_count:self.free_count + n]
+        rng = self.rng
+        theta = rng.uniform(*angle, n)
+        v = rng.uniform(*speed, n)
+        self.pos[idx, 0] = x + rng.uniform(-spread, spread, n)
+        self.pos[idx, 1] = y + rng.uniform(-spread, spread, n)
+        self.vel[idx, 0] = np.cos(theta) * v
+        self.vel[idx, 1] = np.sin(theta) * v
+        self.max_life[idx] = self.life[idx] = rng.uniform(*life, n)
+        self.color[idx] = rng.integers(0, self.colors, n)
+        self.alive[idx] = True
+        return n
+
+    def update(self, dt):
+        # dt in seconds
+        live = np.flatnonzero(self.alive)
+        if not len(live):
+            return
+        vel = self.vel[live]
+        if self.drag:
+            vel *= max(0.0, 1 - self.drag * dt)
+        vel[:, 1] += self.gravity * dt
+        self.vel[live] = vel
+        self.pos[live] += vel * dt
+        self.life[live] -= dt
+        dead = live[self.life[live] <= 0]
+        if len(dead):
+            self.alive[dead] = False
+            self.free[self.free_count:self.free_count + len(dead)] = dead
+            self.free_count += len(dead)
+
+    def clear(self):
+        self.alive[:] = False
+        self.free[:] = np.arange(self.capacity - 1, -1, -1, dtype=np.int32)
+        self.free_count = self.capacity
+
+    def draw(self, target, camera_offset=(0, 0)):
+        live = np.flatnonzero(self.alive)
+        if not len(live):
+            return
+        pos = self.pos[live] - np.asarray(camera_offset, dtype=np.float32)
+        width, height = target.get_size()
+        onscreen = (pos[:, 0] > -8) & (pos[:, 0] < width) & (pos[:, 1] > -8) & (pos[:, 1] < height)
+        live, pos = live[onscreen], pos[onscreen].astype(np.int32)
+        faded = 1 - self.life[live] / self.max_life[live]
+        step = np.minimum((faded * FADE_STEPS).astype(np.int16), FADE_STEPS - 1)
+        sprites = self.sprites[self.color[live] * FADE_STEPS + step]
+        target.blits(zip(sprites, pos.tolist()), doreturn=False)
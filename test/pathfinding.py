@@ -0,0 +1,305 @@
+import heapq
+import time
+from collections import deque
+
+# === Tile pathfinding: plain A* plus an HPA*-style cluster abstraction
+# Tiles are addressed by flat index (y * width + x) and movement is 4-connected.
+# The map is cut into square clusters; walkable runs along each shared border
+# become entrance pairs. Entrances are built at load; the distances between the
+# entrances of each cluster (its links) are built after load by warm_up(), a
+# few clusters per frame, since doing all of them up front takes seconds on
+# large maps. A search that reaches a cluster before warm_up() has builds its
+# links on the spot. Whole routes are cached per (start cluster, goal cluster).
+
+CLUSTER_SIZE = 16
+MAX_SINGLE_ENTRANCE = 6  # longer border runs get an entrance at each end
+
+
+class Pathfinder:
+    def __init__(self, walkable, cluster_size=CLUSTER_SIZE):
+        self.height, self.width = walkable.shape
+        self.walkable = walkable.ravel().tolist()
+        self.cluster_size = cluster_size
+        self.clusters_x = (self.width + cluster_size - 1) // cluster_size
+        self.clusters_y = (self.height + cluster_size - 1) // cluster_size
+
+        self.border_entrances = {}  # (cluster a, cluster b) -> [(tile in a, tile in b)]
+        self.inter_edges = {}       # tile -> set of entrance tiles across a border
+        self.links = {}             # cluster -> {entrance tile: [(entrance tile, cost)]}
+        self.segments = {}          # cluster -> {(entrance tile, entrance tile): refined tiles}
+        self.path_cache = {}        # (start cluster, goal cluster) -> (entrance route, clusters crossed)
+        self.unlinked = deque()     # clusters warm_up() still has to link
+
+        for cy in range(self.clusters_y):
+            for cx in range(self.clusters_x):
+                if cx + 1 < self.clusters_x:
+                    self._build_border((cx, cy), (cx + 1, cy))
+                if cy + 1 < self.clusters_y:
+                    self._build_border((cx, cy), (cx, cy + 1))
+                self.unlinked.append((cx, cy))
+
+    # --- Grid helpers
+
+    def cluster_of(self, tile):
+        y, x = divmod(tile, self.width)
+        return (x // self.cluster_size, y // self.cluster_size)
+
+    def cluster_bounds(self, cluster):
+        x0 = cluster[0] * self.cluster_size
+        y0 = cluster[1] * self.cluster_size
+        return x0, y0, min(x0 + self.cluster_size, self.width), min(y0 + self.cluster_size, self.height)
+
+    def is_walkable(self, x, y):
+        return 0 <= x < self.width and 0 <= y < self.height and self.walkable[y * self.width + x]
+
+    # --- Entrances
+
+    def _build_border(self, a, b):
+        key = (a, b)
+        for ta, tb in self.border_entrances.pop(key, []):
+            self.inter_edges.get(ta, set()).discard(tb)
+            self.inter_edges.get(tb, set()).discard(ta)
+
+        ax0, ay0, ax1, ay1 = self.cluster_bounds(a)
+        if a[0] != b[0]:  # vertical border between horizontal neighbours
+            pairs = [((ax1 - 1, y), (ax1, y)) for y in range(ay0, ay1)]
+        else:
+            pairs = [((x, ay1 - 1), (x, ay1)) for x in range(ax0, ax1)]
+
+        entrances = []
+        run = []
+        for pa, pb in pairs + [(None, None)]:
+            if pa is not None and self.is_walkable(*pa) and self.is_walkable(*pb):
+                run.append((pa, pb))
+                continue
+            if run:
+                if len(run) >= MAX_SINGLE_ENTRANCE:
+                    entrances += [run[0], run[-1]]
+                else:
+                    entrances.append(run[len(run) // 2])
+                run = []
+
+        self.border_entrances[key] = []
+        for (xa, ya), (xb, yb) in entrances:
+            ta = ya * self.width + xa
+            tb = yb * self.width + xb
+            self.border_entrances[key].append((ta, tb))
+            self.inter_edges.setdefault(ta, set()).add(tb)
+            self.inter_edges.setdefault(tb, set()).add(ta)
+
+    def _neighbour_borders(self, cluster):
+        cx, cy = cluster
+        borders = []
+        if cx > 0:
+            borders.append(((cx - 1, cy), cluster))
+        if cx + 1 < self.clusters_x:
+            borders.append((cluster, (cx + 1, cy)))
+        if cy > 0:
+            borders.append(((cx, cy - 1), cluster))
+        if cy + 1 < self.clusters_y:
+            borders.append((cluster, (cx, cy + 1)))
+        return borders
+
+    def cluster_entrances(self, cluster):
+        tiles = set()
+        for key in self._neighbour_borders(cluster):
+            for ta, tb in self.border_entrances.get(key, []):
+                tiles.add(ta if key[0] == cluster else tb)
+        return tiles
+
+    def _cluster_links(self, cluster):
+        # Abstract graph edges for one cluster: distances to the other entrances
+        # of the same cluster plus the unit-cost hops across its borders
+        links = self.links.get(cluster)
+        if links is None:
+            entrances = self.cluster_entrances(cluster)
+            bounds = self.cluster_bounds(cluster)
+            links = {}
+            for tile in entrances:
+                dist = self._distances(tile, bounds)
+                links[tile] = [(other, dist[other]) for other in entrances if other != tile and other in dist]
+                links[tile] += [(other, 1) for other in self.inter_edges.get(tile, ())]
+            self.links[cluster] = links
+        return links
+
+    def warm_up(self, budget_ms=1.0):
+        # Link clusters ahead of the searches that need them; False once all are linked
+        deadline = time.perf_counter() + budget_ms / 1000
+        while self.unlinked and time.perf_counter() < deadline:
+            cluster = self.unlinked.popleft()
+            if cluster not in self.links:
+                self._cluster_links(cluster)
+        return bool(self.unlinked)
+
+    # --- Tile changes
+
+    def set_walkable(self, x, y, walkable):
+        tile = y * self.width + x
+        if self.walkable[tile] == walkable:
+            return
+        self.walkable[tile] = walkable
+        cluster = self.cluster_of(tile)
+        touched = {cluster}
+        for a, b in self._neighbour_borders(cluster):
+            self._build_border(a, b)
+            touched.update((a, b))
+        for c in touched:
+            self.links.pop(c, None)
+            self.segments.pop(c, None)
+            self.unlinked.append(c)
+        # Drop cached routes that started, ended or passed through a rebuilt cluster
+        for key, (_, crossed) in list(self.path_cache.items()):
+            if crossed & touched:
+                del self.path_cache[key]
+
+    # --- Low level searches
+
+    def _distances(self, start, bounds):
+        # Breadth-first distances from start, restricted to bounds
+        x0, y0, x1, y1 = bounds
+        width = self.width
+        dist = {start: 0}
+        frontier = [start]
+        while frontier:
+            next_frontier = []
+            for tile in frontier:
+                y, x = divmod(tile, width)
+                d = dist[tile] + 1
+                for nx, ny in ((x - 1, y), (x + 1, y), (x, y - 1), (x, y + 1)):
+                    if x0 <= nx < x1 and y0 <= ny < y1:
+                        n = ny * width + nx
+                        if n not in dist and self.walkable[n]:
+                            dist[n] = d
+                            next_frontier.append(n)
+            frontier = next_frontier
+        return dist
+
+    def astar(self, start, goal, bounds=None):
+        # Tile-level A* with a binary heap; returns a list of flat tile indices or None
+        if not (self.walkable[start] and self.walkable[goal]):
+            return None
+        x0, y0, x1, y1 = bounds or (0, 0, self.width, self.height)
+        width = self.width
+        walkable = self.walkable
+        gy, gx = divmod(goal, width)
+
+        came_from = {start: None}
+        cost = {start: 0}
+        sy, sx = divmod(start, width)
+        heap = [(abs(sx - gx) + abs(sy - gy), 0, start)]
+        while heap:
+            _, g, tile = heapq.heappop(heap)
+            if tile == goal:
+                path = []
+                while tile is not None:
+                    path.append(tile)
+                    tile = came_from[tile]
+                return path[::-1]
+            if g > cost[tile]:
+                continue
+            y, x = divmod(tile, width)
+            for nx, ny in ((x - 1, y), (x + 1, y), (x, y - 1), (x, y + 1)):
+                if x0 <= nx < x1 and y0 <= ny < y1:
+                    n = ny * width + nx
+                    if walkable[n] and g + 1 < cost.get(n, 1 << 30):
+                        cost[n] = g + 1
+                        came_from[n] = tile
+                        heapq.heappush(heap, (g + 1 + abs(nx - gx) + abs(ny - gy), g + 1, n))
+        return None
+
+    # --- Hierarchical search
+
+    def _abstract_route(self, start, goal, start_links, goal_links):
+        width = self.width
+        gy, gx = divmod(goal, width)
+
+        def h(tile):
+            y, x = divmod(tile, width)
+            return abs(x - gx) + abs(y - gy)
+
+        start_links = list(start_links.items()) + [(n, 1) for n in self.inter_edges.get(start, ())]
+        came_from = {start: None}
+        cost = {start: 0}
+        heap = [(h(start), 0, start)]
+        while heap:
+            _, g, node = heapq.heappop(heap)
+            if node == goal:
+                route = []
+                while node is not None:
+                    route.append(node)
+                    node = came_from[node]
+                return route[::-1]
+            if g > cost[node]:
+                continue
+            if node == start:
+                links = start_links
+            else:
+                links = self._cluster_links(self.cluster_of(node)).get(node, ())
+                if node in goal_links:
+                    links = links + [(goal, goal_links[node])]
+            for n, step in links:
+                new_cost = g + step
+                if new_cost < cost.get(n, 1 << 30):
+                    cost[n] = new_cost
+                    came_from[n] = node
+                    heapq.heappush(heap, (new_cost + h(n), new_cost, n))
+        return None
+
+    def _refine(self, route):
+        path = [route[0]]
+        last = len(route) - 2
+        for i, (a, b) in enumerate(zip(route, route[1:])):
+            cluster = self.cluster_of(a)
+            if cluster != self.cluster_of(b):
+                path.append(b)  # border crossing between adjacent entrance tiles
+                continue
+            # Entrance-to-entrance segments are reused; the start/goal legs are not
+            cached = 0 < i < last
+            segments = self.segments.setdefault(cluster, {})
+            segment = segments.get((a, b)) if cached else None
+            if segment is None:
+                segment = self.astar(a, b, self.cluster_bounds(cluster))
+                if segment is None:
+                    return None
+                if cached:
+                    segments[(a, b)] = segment
+            path += segment[1:]
+        return path
+
+    def find_path(self, start_xy, goal_xy):
+        # Returns a list of (x, y) tiles from start to goal inclusive, or None
+        start = start_xy[1] * self.width + start_xy[0]
+        goal = goal_xy[1] * self.width + goal_xy[0]
+        if not (self.walkable[start] and self.walkable[goal]):
+            return None
+
+        start_cluster = self.cluster_of(start)
+        goal_cluster = self.cluster_of(goal)
+        if start_cluster == goal_cluster:
+            path = self.astar(start, goal, self.cluster_bounds(start_cluster))
+            if path is not None:
+                return [divmod(t, self.width)[::-1] for t in path]
+
+        start_entrances = self.cluster_entrances(start_cluster)
+        goal_entrances = self.cluster_entrances(goal_cluster)
+        start_dist = self._distances(start, self.cluster_bounds(start_cluster))
+        goal_dist = self._distances(goal, self.cluster_bounds(goal_cluster))
+        start_links = {t: start_dist[t] for t in start_entrances if t in start_dist}
+        goal_links = {t: goal_dist[t] for t in goal_entrances if t in goal_dist}
+
+        key = (start_cluster, goal_cluster)
+        cached = self.path_cache.get(key)
+        if cached and cached[0][0] in start_links and cached[0][-1] in goal_links:
+            route = [start] + cached[0] + [goal]
+        else:
+            route = self._abstract_route(start, goal, start_links, goal_links)
+            if route is None:
+                return None
+            if len(route) > 2:
+                crossed = {self.cluster_of(t) for t in route}
+                self.path_cache[key] = (route[1:-1], crossed)
+
+        path = self._refine(route)
+        if path is None:
+            return None
+        return [divmod(t, self.width)[::-1] for t in path]
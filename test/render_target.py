@@ -0,0 +1,42 @@
+import os
+
+import pygame
+
+# === Internal render resolution
+# The world is drawn onto `surface` at the internal resolution, then scaled to the
+# window once per frame in present(). UI is drawn on the display afterwards so
+# text stays crisp. At the window's own size `surface` is the display itself and
+# present() costs nothing.
+
+RENDER_SIZES = [(1280, 768), (960, 576), (640, 384)]
+
+
+def size_from_env(default):
+    # HOC_RENDER_SIZE=640x384 picks the internal resolution at startup
+    value = os.environ.get("HOC_RENDER_SIZE", "")
+    try:
+        width, height = (int(part) for part in value.lower().split("x"))
+    except ValueError:
+        return default
+    return width, height
+
+
+class RenderTarget:
+    def __init__(self, display, size=None):
+        self.display = display
+        self.resize(size or display.get_size())
+
+    def resize(self, size):
+        self.size = tuple(size)
+        if self.size == self.display.get_size():
+            self.surface = self.display
+        else:
+            self.surface = pygame.Surface(self.size).convert()
+
+    def cycle(self, sizes=RENDER_SIZES):
+        index = sizes.index(self.size) + 1 if self.size in sizes else 0
+        self.resize(sizes[index % len(sizes)])
+
+    def present(self):
+        if self.surface is not self.display:
+            pygame.transform.scale(self.surface, self.display.get_size(), self.display)
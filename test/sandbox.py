@@ -0,0 +1,228 @@
+import json
+import os
+import queue
+import signal
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import Future
+
+from challenges import CHALLENGES, grade
+
+# === Sandbox worker pool for grading player code
+# Each worker is a `python sandbox.py --worker` process fed one JSON job per
+# line, so a crash, runaway loop or memory blow-up only takes down that worker.
+# Every job also runs in a process of its own: the worker forks a child per job
+# (where os.fork exists; elsewhere the parent respawns the worker after each
+# job), so nothing a submission changes -- the challenge registry, builtins,
+# imported modules -- is seen by the next submission, which may be another
+# student's. This isolates the game/server and its players from each other's
+# code; it is not a security boundary against hostile code.
+#
+# Time limits are enforced twice: a SIGALRM inside the job (where available)
+# interrupts ordinary Python loops, and the parent kills the worker's whole
+# process group and respawns it when it still hasn't answered shortly after
+# that. Challenges that benchmark the player's code can ask for a longer limit
+# with their own "timeout".
+
+DEFAULT_TIMEOUT = 2.0   # seconds of player code per submission
+KILL_GRACE = 1.0        # extra seconds before the parent kills the worker
+MEMORY_LIMIT = 512 * 1024 * 1024
+
+WORKER_SCRIPT = os.path.abspath(__file__)
+FORK_PER_JOB = hasattr(os, "fork")
+
+
+class TimeLimitExceeded(Exception):
+    pass
+
+
+# === Worker process
+
+def _limit_resources():
+    try:
+        import resource
+    except ImportError:
+        return
+    try:
+        resource.setrlimit(resource.RLIMIT_AS, (MEMORY_LIMIT, MEMORY_LIMIT))
+    except (ValueError, OSError):
+        pass
+
+
+def _run_job(job, timeout):
+    timeout = job.get("timeout", timeout)
+    use_alarm = hasattr(signal, "setitimer")
+    if use_alarm:
+        def on_alarm(signum, frame):
+            raise TimeLimitExceeded(f"time limit exceeded ({timeout:g} s)")
+
+        signal.signal(signal.SIGALRM, on_alarm)
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+    start = time.perf_counter()
+    try:
+        solved, message = grade(job["name"], job["code"])
+    except TimeLimitExceeded as e:  # fired outside the player's code
+        solved, message = False, f"⚠️ Error: {e}"
+    except MemoryError:
+        solved, message = False, "⚠️ Error: out of memory"
+    finally:
+        if use_alarm:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+    return {"id": job["id"], "solved": solved, "message": message, "ms": (time.perf_counter() - start) * 1000}
+
+
+def worker_main(timeout):
+    # Keep the protocol stream private; anything the player prints goes to stderr,
+    # including writes to fd 1 from subprocesses and sys.__stdout__
+    protocol = os.fdopen(os.dup(sys.stdout.fileno()), "w", encoding="utf-8")
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+    sys.stdout = sys.__stdout__ = sys.stderr
+    _limit_resources()
+    for line in sys.stdin:
+        job = json.loads(line)
+        result = _run_forked(job, timeout, protocol) if FORK_PER_JOB else _run_job(job, timeout)
+        protocol.write(json.dumps(result) + "\n")
+        protocol.flush()
+
+
+def _run_forked(job, timeout, protocol):
+    # Run one job in a child process that exits afterwards, taking its changes with it
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.close(read_fd)
+        protocol.close()
+        devnull = os.open(os.devnull, os.O_RDONLY)
+        os.dup2(devnull, 0)  # the job stream stays with the worker
+        data = b""
+        try:
+            data = json.dumps(_run_job(job, timeout)).encode("utf-8")
+        finally:
+            with os.fdopen(write_fd, "wb") as out:
+                out.write(data)
+            os._exit(0)
+    os.close(write_fd)
+    with os.fdopen(read_fd, "rb") as result_pipe:
+        data = result_pipe.read()
+    os.waitpid(pid, 0)
+    try:
+        result = json.loads(data)
+        if result["id"] == job["id"]:
+            return result
+    except (ValueError, TypeError, KeyError):
+        pass
+    return {"id": job["id"], "solved": False, "message": "⚠️ Error: your code crashed the grader", "ms": 0.0}
+
+
+# === Parent side
+
+class SandboxPool:
+    def __init__(self, workers=None, timeout=DEFAULT_TIMEOUT):
+        self.timeout = timeout
+        self.workers = workers or os.cpu_count() or 2
+        self._jobs = queue.Queue()
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self._threads = [threading.Thread(target=self._serve, daemon=True) for _ in range(self.workers)]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, name, code):
+        # Returns a concurrent.futures.Future resolving to {"solved", "message", "ms"}
+        future = Future()
+        with self._lock:
+            job_id = self._next_id
+            self._next_id += 1
+        timeout = self.timeout_for(name)
+        self._jobs.put((future, {"id": job_id, "name": name, "code": code, "timeout": timeout}))
+        return future
+
+    def timeout_for(self, name):
+        # Seconds of player code allowed for one submission to this challenge
+        return max(self.timeout, CHALLENGES.get(name, {}).get("timeout", 0))
+
+    def close(self):
+        for _ in self._threads:
+            self._jobs.put(None)
+        for thread in self._threads:
+            thread.join()
+
+    def _spawn(self):
+        return subprocess.Popen(
+            [sys.executable, WORKER_SCRIPT, "--worker", str(self.timeout)],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+            text=True, encoding="utf-8", bufsize=1,
+            cwd=os.path.dirname(WORKER_SCRIPT),
+            start_new_session=FORK_PER_JOB,  # so a kill also takes down the job's child
+        )
+
+    def _kill(self, process):
+        if FORK_PER_JOB:
+            try:
+                os.killpg(process.pid, signal.SIGKILL)
+            except OSError:
+                pass
+        process.kill()
+
+    def _serve(self):
+        # One thread per worker: hand it a job, wait for the answer, kill it if it hangs
+        process = self._spawn()
+        while True:
+            item = self._jobs.get()
+            if item is None:
+                break
+            future, job = item
+            if not future.set_running_or_notify_cancel():
+                continue
+            killed = threading.Event()
+
+            def kill(process=process):
+                killed.set()
+                self._kill(process)
+
+            killer = threading.Timer(job["timeout"] + KILL_GRACE, kill)
+            killer.start()
+            start = time.perf_counter()
+            try:
+                process.stdin.write(json.dumps(job) + "\n")
+                process.stdin.flush()
+                line = process.stdout.readline()
+            except (BrokenPipeError, OSError):
+                line = ""
+            finally:
+                killer.cancel()
+            result = None
+            if line:
+                try:
+                    result = json.loads(line)
+                    if result.pop("id") != job["id"]:
+                        result = None
+                except (ValueError, TypeError, KeyError, AttributeError):
+                    result = None
+            if result is not None:
+                future.set_result(result)
+                if not FORK_PER_JOB:
+                    # No fork: the next job gets a fresh worker instead
+                    process.stdin.close()
+                    process.wait()
+                    process = self._spawn()
+                continue
+            # Worker died, was killed or broke the protocol: report it and start a fresh one
+            self._kill(process)
+            process.wait()
+            if killed.is_set():
+                message = f"⚠️ Error: time limit exceeded ({job['timeout']:g} s)"
+            elif line:
+                message = "⚠️ Error: your code wrote to the grader's output channel"
+            else:
+                message = "⚠️ Error: your code crashed the grader"
+            future.set_result({"solved": False, "message": message, "ms": (time.perf_counter() - start) * 1000})
+            process = self._spawn()
+        process.stdin.close()
+        process.wait()
+
+
+if __name__ == "__main__" and len(sys.argv) >= 2 and sys.argv[1] == "--worker":
+    worker_main(float(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_TIMEOUT)
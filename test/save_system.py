@@ -0,0 +1,203 @@
+import os
+import struct
+import tempfile
+import threading
+import time
+import zlib
+from array import array
+
+import numpy as np
+
+# === Binary save snapshots
+# Layout (little endian):
+#   header   magic "HOCS", version u16, chunk size u16, core length u32, chunk count u32
+#   core     player x/y i32, track u8, solved names, NPC states
+#   index    per chunk: cx u16, cy u16, offset u32, length u32  (offset from file start)
+#   chunks   zlib-compressed u32 gids of every tile layer for that chunk
+# Only the small core is decoded on load; chunks are decompressed when the
+# game first needs them, and untouched chunks are copied into the next save as-is.
+
+MAGIC = b"HOCS"
+VERSION = 1
+CHUNK_SIZE = 16
+SAVE_FOLDER = "saves"
+AUTOSAVE_FILE = os.path.join(SAVE_FOLDER, "autosave.hoc")
+
+_HEADER = struct.Struct("<4sHHII")
+_INDEX_ENTRY = struct.Struct("<HHII")
+
+
+def _pack_str(text):
+    data = text.encode("utf-8")
+    return struct.pack("<H", len(data)) + data
+
+
+def _unpack_str(buf, offset):
+    (length,) = struct.unpack_from("<H", buf, offset)
+    offset += 2
+    return bytes(buf[offset:offset + length]).decode("utf-8"), offset + length
+
+
+# === Chunks
+
+def pack_chunk(map_data, cx, cy, chunk_size=CHUNK_SIZE):
+    width, height = map_data["width"], map_data["height"]
+    x0, y0 = cx * chunk_size, cy * chunk_size
+    x1, y1 = min(x0 + chunk_size, width), min(y0 + chunk_size, height)
+    gids = array("I")
+    for layer in map_data["layers"]:
+        if layer["type"] != "tilelayer":
+            continue
+        data = layer["data"]
+        for y in range(y0, y1):
+            gids.extend(data[y * width + x0:y * width + x1])
+    return zlib.compress(gids.tobytes(), 6)
+
+
+def unpack_chunk(map_data, blob, cx, cy, chunk_size=CHUNK_SIZE):
+    # Returns (x0, y0, gids) with gids shaped (layers, rows, cols)
+    width, height = map_data["width"], map_data["height"]
+    x0, y0 = cx * chunk_size, cy * chunk_size
+    x1, y1 = min(x0 + chunk_size, width), min(y0 + chunk_size, height)
+    gids = np.frombuffer(zlib.decompress(blob), dtype="<u4")
+    return x0, y0, gids.reshape(-1, y1 - y0, x1 - x0)
+
+
+# === Encoding
+
+def encode_snapshot(state):
+    core = bytearray()
+    core += struct.pack("<iiB", int(state["player"][0]), int(state["player"][1]), state["track"])
+    core += struct.pack("<H", len(state["solved"]))
+    for name in sorted(state["solved"]):
+        core += _pack_str(name)
+    core += struct.pack("<H", len(state["npcs"]))
+    for name, x, y, patrol_index in state["npcs"]:
+        core += _pack_str(name) + struct.pack("<hhh", x, y, patrol_index)
+
+    chunks = sorted(state["chunks"].items())
+    offset = _HEADER.size + len(core) + _INDEX_ENTRY.size * len(chunks)
+    index = bytearray()
+    for (cx, cy), blob in chunks:
+        index += _INDEX_ENTRY.pack(cx, cy, offset, len(blob))
+        offset += len(blob)
+
+    header = _HEADER.pack(MAGIC, VERSION, state.get("chunk_size", CHUNK_SIZE), len(core), len(chunks))
+    return b"".join([header, bytes(core), bytes(index)] + [blob for _, blob in chunks])
+
+
+class Snapshot:
+    def __init__(self, data):
+        magic, version, chunk_size, core_length, chunk_count = _HEADER.unpack_from(data, 0)
+        if magic != MAGIC:
+            raise ValueError("not a Hero of Codemere save")
+        if version != VERSION:
+            raise ValueError(f"unsupported save version {version}")
+        self.data = memoryview(data)
+        self.chunk_size = chunk_size
+
+        offset = _HEADER.size
+        x, y, self.track = struct.unpack_from("<iiB", data, offset)
+        self.player = (x, y)
+        offset += 9
+        (count,) = struct.unpack_from("<H", data, offset)
+        offset += 2
+        self.solved = set()
+        for _ in range(count):
+            name, offset = _unpack_str(data, offset)
+            self.solved.add(name)
+        (count,) = struct.unpack_from("<H", data, offset)
+        offset += 2
+        self.npcs = {}
+        for _ in range(count):
+            name, offset = _unpack_str(data, offset)
+            self.npcs[name] = struct.unpack_from("<hhh", data, offset)
+            offset += 6
+
+        offset = _HEADER.size + core_length
+        self.chunk_index = {}
+        for _ in range(chunk_count):
+            cx, cy, chunk_offset, length = _INDEX_ENTRY.unpack_from(data, offset)
+            self.chunk_index[(cx, cy)] = (chunk_offset, length)
+            offset += _INDEX_ENTRY.size
+
+    @classmethod
+    def open(cls, path):
+        with open(path, "rb") as f:
+            return cls(f.read())
+
+    def chunk_blob(self, cx, cy):
+        chunk_offset, length = self.chunk_index[(cx, cy)]
+        return bytes(self.data[chunk_offset:chunk_offset + length])
+
+
+# === Writing
+
+def write_atomic(path, data):
+    folder = os.path.dirname(path) or "."
+    os.makedirs(folder, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=folder, prefix=".save-", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+class Autosaver:
+    # Encodes and writes snapshots on a background thread; the newest request wins
+    def __init__(self, path=AUTOSAVE_FILE):
+        self.path = path
+        self.last_error = None
+        self.last_save_ms = 0.0
+        self.last_size = 0
+        self._cond = threading.Condition()
+        self._pending = None
+        self._busy = False
+        self._running = True
+        self._thread = threading.Thread(target=self._worker, daemon=True)
+        self._thread.start()
+
+    def save(self, state):
+        with self._cond:
+            self._pending = state
+            self._cond.notify_all()
+
+    def flush(self):
+        with self._cond:
+            while self._pending is not None or self._busy:
+                self._cond.wait()
+
+    def stop(self):
+        self.flush()
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        self._thread.join()
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                while self._running and self._pending is None:
+                    self._cond.wait()
+                if self._pending is None:
+                    return
+                state, self._pending = self._pending, None
+                self._busy = True
+            try:
+                start = time.perf_counter()
+                data = encode_snapshot(state)
+                write_atomic(self.path, data)
+                self.last_save_ms = (time.perf_counter() - start) * 1000
+                self.last_size = len(data)
+                self.last_error = None
+            except (OSError, struct.error, ValueError) as e:
+                self.last_error = e
+            with self._cond:
+                self._busy = False
+                self._cond.notify_all()
@@ -0,0 +1,125 @@
+import pygame
+
+# === Scroll-reuse map renderer
+# Keeps last frame's tile layers in an offscreen surface. When the camera moves
+# by less than a screen, the old pixels are shifted with Surface.scroll() and
+# only the newly exposed row/column strips are cleared and redrawn, so a normal
+# 5 px walking step redraws one thin strip of tiles instead of the whole view.
+# Tiles hidden with update_hidden() (overhangs the sprite layer draws) are skipped.
+
+
+def build_tile_sources(tilesets):
+    # gid -> (atlas surface, source rect), replacing a per-tile tileset search
+    sources = {}
+    ordered = sorted(tilesets, key=lambda ts: ts["firstgid"])
+    for i, ts in enumerate(ordered):
+        if ts["image"] is None:
+            continue  # atlas not loaded because the map doesn't use it
+        rows = ts["image"].get_height() // ts["tileheight"]
+        last = ts["firstgid"] + ts["columns"] * rows
+        if i + 1 < len(ordered):
+            last = min(last, ordered[i + 1]["firstgid"])
+        for gid in range(ts["firstgid"], last):
+            local_gid = gid - ts["firstgid"]
+            col = local_gid % ts["columns"]
+            row = local_gid // ts["columns"]
+            rect = pygame.Rect(col * ts["tilewidth"], row * ts["tileheight"], ts["tilewidth"], ts["tileheight"])
+            sources[gid] = (ts["image"], rect)
+    return sources
+
+
+class ScrollRenderer:
+    def __init__(self, map_data, tilesets):
+        self.map_data = map_data
+        self.tile_width = map_data["tilewidth"]
+        self.tile_height = map_data["tileheight"]
+        self.width = map_data["width"]
+        self.height = map_data["height"]
+        self.layers = [layer["data"] for layer in map_data["layers"] if layer["type"] == "tilelayer"]
+        self.hidden = [set() for _ in self.layers]
+        self.set_tilesets(tilesets)
+        self.frame = None
+        self.offset = None
+        self.tiles_drawn = 0  # per draw() call, for benchmarks
+
+    def set_tilesets(self, tilesets):
+        self.sources = build_tile_sources(tilesets)
+        self.offset = None
+
+    def update_hidden(self, index, hide, show):
+        # Hide/show tiles of one tile layer, redrawing the on-screen ones that flipped
+        hidden = self.hidden[index]
+        flipped = (hide - hidden) | (show & hidden)
+        hidden |= hide
+        hidden -= show
+        for flat in flipped:
+            y, x = divmod(flat, self.width)
+            self.invalidate_tiles(x, y, x + 1, y + 1)
+
+    def invalidate(self):
+        self.offset = None
+
+    def invalidate_tiles(self, x0, y0, x1, y1):
+        # Redraw a changed rectangle of tiles if it is on screen
+        if self.frame is None or self.offset is None:
+            return
+        rect = pygame.Rect(
+            x0 * self.tile_width - self.offset[0], y0 * self.tile_height - self.offset[1],
+            (x1 - x0) * self.tile_width, (y1 - y0) * self.tile_height,
+        ).clip(self.frame.get_rect())
+        if rect.width and rect.height:
+            self._redraw(rect)
+
+    def draw(self, target, camera_offset):
+        size = target.get_size()
+        self.tiles_drawn = 0
+        if self.frame is None or self.frame.get_size() != size:
+            self.frame = pygame.Surface(size).convert(target)
+            self.offset = None
+
+        camera_offset = tuple(camera_offset)
+        if self.offset is None:
+            self.offset = camera_offset
+            self._redraw(self.frame.get_rect())
+        else:
+            dx = camera_offset[0] - self.offset[0]
+            dy = camera_offset[1] - self.offset[1]
+            self.offset = camera_offset
+            if abs(dx) >= size[0] or abs(dy) >= size[1]:
+                self._redraw(self.frame.get_rect())
+            elif dx or dy:
+                self.frame.scroll(-dx, -dy)
+                width, height = size
+                if dx:
+                    self._redraw(pygame.Rect(width - dx if dx > 0 else 0, 0, abs(dx), height))
+                if dy:
+                    self._redraw(pygame.Rect(0, height - dy if dy > 0 else 0, width, abs(dy)))
+        target.blit(self.frame, (0, 0))
+
+    def _redraw(self, rect):
+        # Clear a frame rectangle and draw every tile layer into it, clipped so
+        # alpha-blended tiles never get blended twice over pixels we kept
+        frame = self.frame
+        frame.set_clip(rect)
+        frame.fill((0, 0, 0), rect)
+        ox, oy = self.offset
+        tw, th = self.tile_width, self.tile_height
+        col0 = max(0, (rect.left + ox) // tw)
+        col1 = min(self.width - 1, (rect.right - 1 + ox) // tw)
+        row0 = max(0, (rect.top + oy) // th)
+        row1 = min(self.height - 1, (rect.bottom - 1 + oy) // th)
+        sources = self.sources
+        blits = []
+        for data, hidden in zip(self.layers, self.hidden):
+            for row in range(row0, row1 + 1):
+                base = row * self.width
+                y = row * th - oy
+                for col in range(col0, col1 + 1):
+                    gid = data[base + col]
+                    if gid and not (hidden and base + col in hidden):
+                        source = sources.get(gid)
+                        if source:
+                            blits.append((source[0], (col * tw - ox, y), source[1]))
+        frame.blits(blits, doreturn=False)
+        self.tiles_drawn += len(blits)
+        frame.set_clip(None)
@@ -0,0 +1,427 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import struct
+import sys
+import time
+
+from sandbox import SandboxPool
+from tilemap import build_collision_grid, load_collidable_gids
+
+# === Headless classroom server
+# One process hosts the world and the challenge registry for a whole class.
+# Clients speak a small binary protocol over TCP or a Unix socket:
+#   frame    = length u32 (type + payload), type u8, payload
+#   HELLO    name                               client -> server
+#   MOVE     dx i8, dy i8 (held direction)      client -> server
+#   SUBMIT   challenge name, code               client -> server
+#   WELCOME  your id u16, tick u32, all players server -> client
+#   DELTA    tick u32, moved players, left ids  server -> client, once per tick
+#   VERDICT  challenge name, solved u8, message server -> client
+# Every tick the server encodes a single DELTA holding only the players that
+# moved, joined or left, and sends the same bytes to every client.
+#
+#   python server.py serve [--port 8765 | --unix /tmp/codemere.sock]
+#   python server.py bots --count 200 --seconds 20
+#   python server.py loadtest --bots 200 --seconds 20
+
+MAP_FOLDER = "map"
+MAP_FILE = os.path.join(MAP_FOLDER, "test.tmj")
+HOST, PORT = "127.0.0.1", 8765
+TICK_RATE = 20
+PLAYER_SPEED = 15        # pixels per tick (the game moves 5 px per frame at 60 FPS)
+SPAWN_TILE = (58, 4)
+MAX_BUFFERED = 256 * 1024  # drop clients that stop reading
+MAX_FRAME = 1024 * 1024    # largest frame accepted (a SUBMIT carries the player's code)
+
+HELLO, MOVE, SUBMIT = 1, 2, 3
+WELCOME, DELTA, VERDICT = 10, 11, 12
+
+_FRAME = struct.Struct("<IB")
+_PLAYER = struct.Struct("<Hii")
+
+
+class ProtocolError(Exception):
+    pass
+
+
+# === Protocol
+
+def frame(kind, payload=b""):
+    return _FRAME.pack(len(payload) + 1, kind) + payload
+
+
+def pack_str(text, length_format="<H"):
+    data = text.encode("utf-8")
+    return struct.pack(length_format, len(data)) + data
+
+
+def unpack_str(payload, offset, length_format="<H"):
+    (length,) = struct.unpack_from(length_format, payload, offset)
+    offset += struct.calcsize(length_format)
+    return payload[offset:offset + length].decode("utf-8"), offset + length
+
+
+async def read_frame(reader):
+    length, kind = _FRAME.unpack(await reader.readexactly(_FRAME.size))
+    if not 1 <= length <= MAX_FRAME:
+        raise ProtocolError(f"bad frame length {length}")
+    return kind, await reader.readexactly(length - 1)
+
+
+def encode_players(players):
+    return struct.pack("<H", len(players)) + b"".join(_PLAYER.pack(pid, x, y) for pid, x, y in players)
+
+
+def decode_players(payload, offset):
+    (count,) = struct.unpack_from("<H", payload, offset)
+    offset += 2
+    players = [_PLAYER.unpack_from(payload, offset + i * _PLAYER.size) for i in range(count)]
+    return players, offset + count * _PLAYER.size
+
+
+def encode_delta(tick, moved, removed):
+    payload = struct.pack("<I", tick) + encode_players(moved)
+    payload += struct.pack(f"<H{len(removed)}H", len(removed), *removed)
+    return frame(DELTA, payload)
+
+
+def decode_delta(payload):
+    (tick,) = struct.unpack_from("<I", payload, 0)
+    moved, offset = decode_players(payload, 4)
+    (count,) = struct.unpack_from("<H", payload, offset)
+    removed = struct.unpack_from(f"<{count}H", payload, offset + 2)
+    return tick, moved, removed
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+# === World
+
+class World:
+    def __init__(self, map_data, collision_grid):
+        self.tile_width = map_data["tilewidth"]
+        self.tile_height = map_data["tileheight"]
+        self.pixel_width = map_data["width"] * self.tile_width
+        self.pixel_height = map_data["height"] * self.tile_height
+        self.collision_grid = collision_grid
+        self.players = {}  # id -> {"name", "x", "y", "dx", "dy", "solved"}
+        self._next_id = 0
+
+    def add_player(self, name):
+        while self._next_id in self.players:
+            self._next_id = (self._next_id + 1) % 65536
+        pid = self._next_id
+        self._next_id = (self._next_id + 1) % 65536
+        self.players[pid] = {
+            "name": name,
+            "x": SPAWN_TILE[0] * self.tile_width,
+            "y": SPAWN_TILE[1] * self.tile_height,
+            "dx": 0, "dy": 0,
+            "solved": set(),
+        }
+        return pid
+
+    def is_colliding(self, x, y):
+        tile_x = x // self.tile_width
+        tile_y = y // self.tile_height
+        rows, cols = self.collision_grid.shape
+        return 0 <= tile_x < cols and 0 <= tile_y < rows and bool(self.collision_grid[tile_y, tile_x])
+
+    def step(self):
+        # Same movement rules as the single-player loop; returns ids that moved
+        moved = []
+        for pid, p in self.players.items():
+            if not (p["dx"] or p["dy"]):
+                continue
+            x = p["x"] + p["dx"] * PLAYER_SPEED
+            y = p["y"] + p["dy"] * PLAYER_SPEED
+            if self.is_colliding(x, y):
+                continue
+            x = max(0, min(x, self.pixel_width - self.tile_width))
+            y = max(0, min(y, self.pixel_height - self.tile_height))
+            if (x, y) != (p["x"], p["y"]):
+                p["x"], p["y"] = x, y
+                moved.append(pid)
+        return moved
+
+    def snapshot(self, pids=None):
+        pids = self.players if pids is None else pids
+        return [(pid, self.players[pid]["x"], self.players[pid]["y"]) for pid in pids]
+
+
+def load_world():
+    with open(MAP_FILE) as f:
+        map_data = json.load(f)
+    collision_grid = build_collision_grid(map_data, load_collidable_gids(map_data, MAP_FOLDER))
+    return World(map_data, collision_grid)
+
+
+# === Server
+
+class ClassroomServer:
+    def __init__(self, world, pool):
+        self.world = world
+        self.pool = pool
+        self.clients = {}  # player id -> StreamWriter
+        self.grading = set()  # players with a submission in the sandbox pool
+        self.tick = 0
+        self.joined = []
+        self.left = []
+        self.tick_work_ms = []
+        self.tick_late_ms = []
+        self.bytes_out = 0
+        self.frames_in = 0
+        self.verdicts = 0
+        self.verdict_ms = []
+
+    def _send(self, pid, data):
+        writer = self.clients.get(pid)
+        if writer is None:
+            return
+        if writer.transport.get_write_buffer_size() > MAX_BUFFERED:
+            writer.close()
+            return
+        writer.write(data)
+        self.bytes_out += len(data)
+
+    async def handle_client(self, reader, writer):
+        pid = None
+        try:
+            kind, payload = await read_frame(reader)
+            if kind != HELLO:
+                return
+            name, _ = unpack_str(payload, 0)
+            pid = self.world.add_player(name)
+            self.clients[pid] = writer
+            self.joined.append(pid)
+            welcome = struct.pack("<HI", pid, self.tick) + encode_players(self.world.snapshot())
+            self._send(pid, frame(WELCOME, welcome))
+
+            while True:
+                kind, payload = await read_frame(reader)
+                self.frames_in += 1
+                if kind == MOVE:
+                    dx, dy = struct.unpack("<bb", payload)
+                    player = self.world.players[pid]
+                    player["dx"], player["dy"] = max(-1, min(dx, 1)), max(-1, min(dy, 1))
+                elif kind == SUBMIT:
+                    challenge, offset = unpack_str(payload, 0)
+                    code, _ = unpack_str(payload, offset, "<I")
+                    if pid in self.grading:
+                        # One submission per player at a time, so no one can fill the shared pool
+                        busy = pack_str(challenge) + struct.pack("<B", 0) + pack_str("⚠️ Error: still grading your last submission")
+                        self._send(pid, frame(VERDICT, busy))
+                    else:
+                        self.grading.add(pid)
+                        asyncio.ensure_future(self.grade(pid, challenge, code))
+        except (asyncio.IncompleteReadError, ConnectionError, ProtocolError, struct.error, UnicodeDecodeError):
+            pass
+        finally:
+            if pid is not None:
+                self.clients.pop(pid, None)
+                self.world.players.pop(pid, None)
+                self.left.append(pid)
+            writer.close()
+
+    async def grade(self, pid, challenge, code):
+        start = time.perf_counter()
+        try:
+            result = await asyncio.wrap_future(self.pool.submit(challenge, code))
+        finally:
+            self.grading.discard(pid)
+        self.verdicts += 1
+        self.verdict_ms.append((time.perf_counter() - start) * 1000)
+        player = self.world.players.get(pid)
+        if player is None:
+            return
+        if result["solved"]:
+            player["solved"].add(challenge)
+        payload = pack_str(challenge) + struct.pack("<B", result["solved"]) + pack_str(result["message"])
+        self._send(pid, frame(VERDICT, payload))
+
+    async def tick_loop(self):
+        loop = asyncio.get_running_loop()
+        interval = 1 / TICK_RATE
+        deadline = loop.time()
+        while True:
+            self.tick_late_ms.append(max(0.0, loop.time() - deadline) * 1000)
+            start = time.perf_counter()
+            self.tick += 1
+            moved = self.world.step()
+            fresh = [pid for pid in self.joined if pid in self.world.players]
+            changed = self.world.snapshot(dict.fromkeys(moved + fresh))
+            removed, self.joined, self.left = self.left, [], []
+            if changed or removed:
+                data = encode_delta(self.tick, changed, removed)
+                for pid in list(self.clients):
+                    self._send(pid, data)
+            self.tick_work_ms.append((time.perf_counter() - start) * 1000)
+
+            deadline += interval
+            await asyncio.sleep(max(0.0, deadline - loop.time()))
+
+    def report(self, seconds, reset=True):
+        work, late = self.tick_work_ms, self.tick_late_ms
+        print(
+            f"[server] {len(self.clients)} clients | tick work p50 {percentile(work, 0.5):.2f} ms "
+            f"p99 {percentile(work, 0.99):.2f} ms max {max(work, default=0):.2f} ms | "
+            f"tick late p99 {percentile(late, 0.99):.2f} ms | "
+            f"{self.frames_in / seconds:.0f} msgs/s in, {self.bytes_out / seconds / 1024:.0f} KiB/s out | "
+            f"{self.verdicts / seconds:.1f} verdicts/s (p99 {percentile(self.verdict_ms, 0.99):.0f} ms)",
+            flush=True,
+        )
+        if reset:
+            self.tick_work_ms, self.tick_late_ms, self.verdict_ms = [], [], []
+            self.bytes_out = self.frames_in = self.verdicts = 0
+
+    async def report_loop(self, every):
+        while True:
+            await asyncio.sleep(every)
+            self.report(every)
+
+
+async def start_server(args, server):
+    if args.unix:
+        return await asyncio.start_unix_server(server.handle_client, path=args.unix)
+    return await asyncio.start_server(server.handle_client, args.host, args.port)
+
+
+async def serve(args):
+    pool = SandboxPool(args.workers)
+    server = ClassroomServer(load_world(), pool)
+    listener = await start_server(args, server)
+    print(f"[server] listening on {args.unix or f'{args.host}:{args.port}'} with {pool.workers} sandbox workers",
+          flush=True)
+    tasks = [asyncio.ensure_future(server.tick_loop()), asyncio.ensure_future(server.report_loop(args.report_every))]
+    try:
+        async with listener:
+            await listener.serve_forever()
+    finally:
+        for task in tasks:
+            task.cancel()
+        pool.close()
+
+
+# === Synthetic clients
+
+BOT_SUBMISSIONS = [
+    ("Old Man Cedric", "rune = 'elgnis'[::-1]"),
+    ("Old Man Cedric", "rune = 'elgnis'"),
+    ("Bugsy the Apprentice", "for i in range(1, 11):\n    print(i)"),
+    ("Bugsy the Apprentice", "for i in range(1, 10):\n    print(i)"),
+    ("Torchbearer Korr", "def add(a, b):\n    return a + b"),
+    ("Torchbearer Korr", "def add(a, b):\n    return a - b"),
+]
+
+
+async def run_bot(index, args, stats, stop_at):
+    if args.unix:
+        reader, writer = await asyncio.open_unix_connection(args.unix)
+    else:
+        reader, writer = await asyncio.open_connection(args.host, args.port)
+    writer.write(frame(HELLO, pack_str(f"bot-{index}")))
+    rng = random.Random(index)
+    pending = []
+
+    async def receive():
+        while True:
+            kind, payload = await read_frame(reader)
+            stats["bytes"] += len(payload) + _FRAME.size
+            if kind == DELTA:
+                stats["deltas"] += 1
+                stats["entries"] += len(decode_delta(payload)[1])
+            elif kind == VERDICT:
+                stats["verdict_ms"].append((time.perf_counter() - pending.pop(0)) * 1000)
+
+    receiver = asyncio.ensure_future(receive())
+    loop = asyncio.get_running_loop()
+    next_submit = loop.time() + rng.uniform(0, args.submit_every)
+    try:
+        while loop.time() < stop_at:
+            writer.write(frame(MOVE, struct.pack("<bb", rng.randint(-1, 1), rng.randint(-1, 1))))
+            if args.submit_every and loop.time() >= next_submit:
+                challenge, code = rng.choice(BOT_SUBMISSIONS)
+                pending.append(time.perf_counter())
+                writer.write(frame(SUBMIT, pack_str(challenge) + pack_str(code, "<I")))
+                next_submit += args.submit_every
+            await writer.drain()
+            await asyncio.sleep(rng.uniform(0.1, 0.5))
+    finally:
+        receiver.cancel()
+        writer.close()
+
+
+async def bots(args):
+    stats = {"bytes": 0, "deltas": 0, "entries": 0, "verdict_ms": []}
+    start = time.perf_counter()
+    stop_at = asyncio.get_running_loop().time() + args.seconds
+    results = await asyncio.gather(*(run_bot(i, args, stats, stop_at) for i in range(args.count)),
+                                   return_exceptions=True)
+    elapsed = time.perf_counter() - start
+    failed = sum(isinstance(r, Exception) for r in results)
+    verdict_ms = stats["verdict_ms"]
+    print(
+        f"[bots] {args.count} bots for {elapsed:.1f} s ({failed} failed) | "
+        f"{stats['deltas'] / elapsed / max(args.count, 1):.1f} deltas/s per bot, "
+        f"{stats['entries'] / max(stats['deltas'], 1):.1f} players per delta, "
+        f"{stats['bytes'] / elapsed / 1024:.0f} KiB/s received | "
+        f"{len(verdict_ms)} verdicts, round trip p50 {percentile(verdict_ms, 0.5):.0f} ms "
+        f"p99 {percentile(verdict_ms, 0.99):.0f} ms",
+        flush=True,
+    )
+
+
+async def loadtest(args):
+    pool = SandboxPool(args.workers)
+    server = ClassroomServer(load_world(), pool)
+    listener = await start_server(args, server)
+    tick_task = asyncio.ensure_future(server.tick_loop())
+
+    command = [sys.executable, os.path.abspath(__file__), "bots", "--count", str(args.bots),
+               "--seconds", str(args.seconds), "--submit-every", str(args.submit_every)]
+    command += ["--unix", args.unix] if args.unix else ["--host", args.host, "--port", str(args.port)]
+    start = time.perf_counter()
+    process = await asyncio.create_subprocess_exec(*command)
+    await process.wait()
+    server.report(time.perf_counter() - start, reset=False)
+
+    tick_task.cancel()
+    listener.close()
+    await listener.wait_closed()
+    pool.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Hero of Codemere classroom server")
+    sub = parser.add_subparsers(dest="mode", required=True)
+    for mode in ("serve", "bots", "loadtest"):
+        p = sub.add_parser(mode)
+        p.add_argument("--host", default=HOST)
+        p.add_argument("--port", type=int, default=PORT)
+        p.add_argument("--unix", help="listen on / connect to a Unix socket path instead of TCP")
+        if mode in ("serve", "loadtest"):
+            p.add_argument("--workers", type=int, default=None, help="sandbox worker processes")
+        if mode in ("bots", "loadtest"):
+            p.add_argument("--seconds", type=float, default=20)
+            p.add_argument("--submit-every", type=float, default=5.0, help="seconds between submissions per bot")
+    sub.choices["serve"].add_argument("--report-every", type=float, default=5.0)
+    sub.choices["bots"].add_argument("--count", type=int, default=200)
+    sub.choices["loadtest"].add_argument("--bots", type=int, default=200)
+    args = parser.parse_args()
+
+    try:
+        asyncio.run({"serve": serve, "bots": bots, "loadtest": loadtest}[args.mode](args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
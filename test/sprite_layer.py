@@ -0,0 +1,187 @@
+import numpy as np
+import pygame
+
+# === Y-sorted sprite layer
+# Everything that can stand in front of or behind something else is a sprite
+# with a depth: the pixel y of the line it stands on (feet for entities, the
+# ground line for map objects). Sprites live in one bucket per tile row, each a
+# short list of ids kept in depth order. Moving a sprite within its row only
+# marks the row dirty, moving it to another row touches just the two buckets;
+# draw() walks the visible rows top to bottom, re-sorts the few dirty ones (a
+# near-linear pass over an almost sorted list) and issues one Surface.blits().
+#
+# Tall map objects (trees, buildings) are split once at load: each connected
+# cluster of their tiles keeps its lowest tile per column in the static map
+# (the base, always under entities), and every tile above it becomes a sprite
+# at the cluster's ground line (the overhang). Walking behind a tree then puts
+# the canopy over the player, walking in front puts the player over it.
+# When tiles change, only the clusters around the changed rectangle are split
+# again, so the map renderer redraws just the tiles whose hidden state flips.
+
+TALL_TILESETS = ("Trees_Bushes", "Buildings")
+
+
+def tall_gids(tilesets, names=TALL_TILESETS):
+    return [ts["firstgid"] + i for ts in tilesets if ts["name"] in names for i in range(ts["tilecount"])]
+
+
+def label_clusters(mask):
+    # 4-connected components of a bool grid: each cell gets the smallest flat index
+    # in its component (-1 outside the mask), by min-propagation until stable
+    none = mask.size
+    labels = np.where(mask, np.arange(mask.size).reshape(mask.shape), none)
+    while True:
+        spread = labels.copy()
+        np.minimum(spread[1:], labels[:-1], out=spread[1:])
+        np.minimum(spread[:-1], labels[1:], out=spread[:-1])
+        np.minimum(spread[:, 1:], labels[:, :-1], out=spread[:, 1:])
+        np.minimum(spread[:, :-1], labels[:, 1:], out=spread[:, :-1])
+        spread[~mask] = none
+        if np.array_equal(spread, labels):
+            return np.where(mask, labels, -1)
+        labels = spread
+
+
+def _overhangs(grid, gids, region):
+    # (rows, cols, ground rows) of the overhang tiles of every cluster in `grid`
+    # touching the bool mask `region`, and the mask of cells those clusters cover
+    labels = label_clusters(np.isin(grid, gids))
+    labels = np.where(np.isin(labels, labels[region & (labels >= 0)]), labels, -1)
+    covered = labels >= 0
+    rows, cols = np.nonzero(covered)
+    if not len(rows):
+        return rows, cols, rows, covered
+    _, cluster = np.unique(labels[rows, cols], return_inverse=True)
+    ground = np.zeros(cluster.max() + 1, dtype=np.int64)
+    np.maximum.at(ground, cluster, rows + 1)
+    # The lowest tile of each cluster column is the base and stays in the map
+    _, column = np.unique(cluster * grid.shape[1] + cols, return_inverse=True)
+    lowest = np.zeros(column.max() + 1, dtype=np.int64)
+    np.maximum.at(lowest, column, rows)
+    over = rows < lowest[column]
+    return rows[over], cols[over], ground[cluster[over]], covered
+
+
+def split_overhangs(map_data, gids, rect=None, margin=8):
+    # ([re-split flat indices per tile layer, None for all], [(layer, flat index, gid, depth in tiles)])
+    # for the overhang tiles of the tall objects built from `gids`. With a rect
+    # (x0, y0, x1, y1) of changed tiles, only clusters within a tile of it are
+    # re-split; everything else splits the same as before the change.
+    width, height = map_data["width"], map_data["height"]
+    x0, y0, x1, y1 = rect or (0, 0, width, height)
+    areas, pieces = [], []
+    for index, layer in enumerate(layer for layer in map_data["layers"] if layer["type"] == "tilelayer"):
+        data = layer["data"]
+        grow = margin
+        while True:
+            wx0, wy0 = max(x0 - grow, 0), max(y0 - grow, 0)
+            wx1, wy1 = min(x1 + grow, width), min(y1 + grow, height)
+            window = np.array([data[row * width + wx0:row * width + wx1] for row in range(wy0, wy1)], dtype=np.int64)
+            region = np.zeros(window.shape, dtype=bool)
+            region[max(y0 - 1, 0) - wy0:y1 + 1 - wy0, max(x0 - 1, 0) - wx0:x1 + 1 - wx0] = True
+            rows, cols, ground, covered = _overhangs(window, gids, region)
+            # A cluster cut off by the window (rather than the map) edge may go on outside it
+            cut = ((wy0 > 0 and covered[0].any()) or (wy1 < height and covered[-1].any())
+                   or (wx0 > 0 and covered[:, 0].any()) or (wx1 < width and covered[:, -1].any()))
+            if not cut:
+                break
+            grow *= 2
+        if rect is None:
+            areas.append(None)
+        else:
+            covered[y0 - wy0:y1 - wy0, x0 - wx0:x1 - wx0] = True  # tiles that stopped being tall
+            cy, cx = np.nonzero(covered)
+            areas.append(set(((cy + wy0) * width + cx + wx0).tolist()))
+        flat = (rows + wy0) * width + cols + wx0
+        pieces.extend(zip([index] * len(flat), flat.tolist(), window[rows, cols].tolist(), (ground + wy0).tolist()))
+    return areas, pieces
+
+
+class SpriteLayer:
+    def __init__(self, row_height, rows):
+        self.row_height = row_height
+        self.buckets = [[] for _ in range(rows + 1)]  # sprite ids, sorted by depth when clean
+        self.dirty = set()  # buckets that need re-sorting before they are drawn
+        self.sprites = {}   # id -> [image, area, x, y, depth, bucket]
+        self.static = []    # ids added by set_static()
+        self.rise = 0       # how far any sprite reaches above its depth line
+        self.next_id = 0
+        self.drawn = 0      # per draw() call, for benchmarks
+
+    def _bucket(self, depth):
+        return min(max(int(depth) // self.row_height, 0), len(self.buckets) - 1)
+
+    def add(self, image, x, y, depth, area=None):
+        sprite_id = self.next_id
+        self.next_id += 1
+        bucket = self._bucket(depth)
+        self.sprites[sprite_id] = [image, area, x, y, depth, bucket]
+        self.buckets[bucket].append(sprite_id)
+        self.dirty.add(bucket)
+        self.rise = max(self.rise, depth - y)
+        return sprite_id
+
+    def move(self, sprite_id, x, y, depth=None):
+        sprite = self.sprites[sprite_id]
+        sprite[2], sprite[3] = x, y
+        if depth is None or depth == sprite[4]:
+            return
+        sprite[4] = depth
+        bucket = self._bucket(depth)
+        if bucket != sprite[5]:
+            self.buckets[sprite[5]].remove(sprite_id)
+            self.buckets[bucket].append(sprite_id)
+            sprite[5] = bucket
+        self.dirty.add(bucket)
+        self.rise = max(self.rise, depth - y)
+
+    def remove(self, sprite_id):
+        sprite = self.sprites.pop(sprite_id)
+        self.buckets[sprite[5]].remove(sprite_id)
+
+    def set_image(self, sprite_id, image, area=None):
+        self.sprites[sprite_id][0:2] = [image, area]
+
+    def set_static(self, sprites):
+        # Replace every static sprite with (image, area, x, y, depth) tuples
+        static = set(self.static)
+        for bucket in {self.sprites[sprite_id][5] for sprite_id in static}:
+            self.buckets[bucket] = [sprite_id for sprite_id in self.buckets[bucket] if sprite_id not in static]
+        for sprite_id in static:
+            del self.sprites[sprite_id]
+        self.static = [self.add(image, x, y, depth, area) for image, area, x, y, depth in sprites]
+
+    def draw(self, target, camera_offset):
+        ox, oy = camera_offset
+        width, height = target.get_size()
+        first = self._bucket(oy)
+        last = self._bucket(oy + height + self.rise)
+        sprites = self.sprites
+        blits = []
+        for index in range(first, last + 1):
+            bucket = self.buckets[index]
+            if index in self.dirty:
+                # Mostly sorted already, so this is close to linear
+                bucket.sort(key=lambda sprite_id: sprites[sprite_id][4])
+                self.dirty.discard(index)
+            for sprite_id in bucket:
+                image, area, x, y, _, _ = sprites[sprite_id]
+                sx, sy = x - ox, y - oy
+                w, h = area.size if area else image.get_size()
+                if sx < width and sy < height and sx + w > 0 and sy + h > 0:
+                    blits.append((image, (sx, sy), area) if area else (image, (sx, sy)))
+        target.blits(blits, doreturn=False)
+        self.drawn = len(blits)
+
+
+_solid_cache = {}
+
+
+def solid_sprite(color, size):
+    # Plain coloured rectangles (the placeholder art for the player, NPCs and critters)
+    key = (tuple(color), tuple(size))
+    if key not in _solid_cache:
+        image = pygame.Surface(size).convert()
+        image.fill(color)
+        _solid_cache[key] = image
+    return _solid_cache[key]
@@ -0,0 +1,177 @@
+import argparse
+import gzip
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import Counter, defaultdict
+
+# === Gameplay telemetry
+# record() is the only thing the game loop calls: it drops one tuple into a
+# preallocated ring buffer slot, with no lock, formatting or I/O. A background
+# thread wakes every flush_interval seconds, takes everything recorded since the
+# last batch and appends it to gzip JSONL (one gzip member per batch) or to a
+# SQLite table when the path ends in .db/.sqlite. If the game records faster
+# than the writer keeps up, the oldest unflushed events are overwritten and
+# counted in `dropped`.
+#
+#   python telemetry.py                       report on telemetry/events.jsonl.gz
+#   python telemetry.py telemetry/events.db   report on a SQLite log
+#
+# HOC_TELEMETRY=path picks another log file; HOC_TELEMETRY=off keeps recording
+# (it is that cheap) but never writes anything.
+
+TELEMETRY_FILE = os.path.join("telemetry", "events.jsonl.gz")
+
+
+def path_from_env(default=TELEMETRY_FILE):
+    value = os.environ.get("HOC_TELEMETRY", "")
+    if value.lower() in ("0", "off", "false"):
+        return None
+    return value or default
+
+
+def is_sqlite(path):
+    return path.endswith((".db", ".sqlite"))
+
+
+class Telemetry:
+    def __init__(self, path=TELEMETRY_FILE, capacity=4096, flush_interval=2.0):
+        self.path = path
+        self.session = uuid.uuid4().hex[:12]
+        self.capacity = capacity
+        self.flush_interval = flush_interval
+        self.dropped = 0
+        self.written = 0
+        self.last_error = None
+        self._slots = [None] * capacity
+        self._head = 0  # events recorded; only the game thread writes it
+        self._tail = 0  # events handed to the writer; only the writer thread touches it
+        self._cond = threading.Condition()
+        self._running = True
+        self._thread = threading.Thread(target=self._worker, daemon=True)
+        self._thread.start()
+
+    def record(self, kind, **fields):
+        head = self._head
+        self._slots[head % self.capacity] = (time.time(), kind, fields)
+        self._head = head + 1
+
+    def stop(self):
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        self._thread.join()
+
+    def _take_batch(self):
+        head, tail, capacity = self._head, self._tail, self.capacity
+        if head - tail > capacity:
+            self.dropped += head - tail - capacity
+            tail = head - capacity
+        batch = [self._slots[i % capacity] for i in range(tail, head)]
+        # Slots the game thread reused while we were copying hold newer events
+        overrun = self._head - capacity - tail
+        if overrun > 0:
+            self.dropped += overrun
+            batch = batch[overrun:]
+        self._tail = head
+        return batch
+
+    def _worker(self):
+        db = None
+        running = True
+        while running:
+            with self._cond:
+                if self._running:
+                    self._cond.wait(self.flush_interval)
+                running = self._running
+            batch = self._take_batch()
+            if not batch or self.path is None:
+                continue
+            try:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                if is_sqlite(self.path):
+                    db = db or open_db(self.path)
+                    with db:
+                        db.executemany("INSERT INTO events VALUES (?, ?, ?, ?)", [
+                            (ts, self.session, kind, json.dumps(fields)) for ts, kind, fields in batch
+                        ])
+                else:
+                    lines = "".join(json.dumps({"ts": ts, "session": self.session, "kind": kind, **fields}) + "\n"
+                                    for ts, kind, fields in batch)
+                    with gzip.open(self.path, "at", encoding="utf-8") as f:
+                        f.write(lines)
+                self.written += len(batch)
+                self.last_error = None
+            except (OSError, sqlite3.Error, TypeError, ValueError) as e:
+                self.last_error = e
+        if db:
+            db.close()
+
+
+def open_db(path):
+    db = sqlite3.connect(path)
+    db.execute("CREATE TABLE IF NOT EXISTS events (ts REAL, session TEXT, kind TEXT, data TEXT)")
+    return db
+
+
+def load_events(path):
+    if is_sqlite(path):
+        db = open_db(path)
+        try:
+            for ts, session, kind, data in db.execute("SELECT ts, session, kind, data FROM events ORDER BY ts"):
+                yield {"ts": ts, "session": session, "kind": kind, **json.loads(data)}
+        finally:
+            db.close()
+    else:
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def summarize(events):
+    # Per challenge: visits, Run Code attempts, solves, time spent, errors seen
+    stats = defaultdict(lambda: {"visits": 0, "runs": 0, "solved": 0, "seconds": [], "errors": Counter()})
+    sessions = set()
+    for event in events:
+        sessions.add(event.get("session"))
+        npc = event.get("npc")
+        if event["kind"] == "challenge_open":
+            stats[npc]["visits"] += 1
+        elif event["kind"] == "run":
+            stats[npc]["runs"] += 1
+            stats[npc]["solved"] += bool(event.get("solved"))
+            if event.get("error"):
+                stats[npc]["errors"][event["error"]] += 1
+        elif event["kind"] == "challenge_close":
+            stats[npc]["seconds"].append(event.get("seconds", 0))
+    return sessions, dict(stats)
+
+
+def format_report(sessions, stats):
+    lines = [f"{len(sessions)} session(s)"]
+    for npc, s in sorted(stats.items()):
+        seconds = sorted(s["seconds"])
+        median = seconds[len(seconds) // 2] if seconds else 0
+        per_solve = s["runs"] / s["solved"] if s["solved"] else float("nan")
+        lines.append(f"{npc}: {s['visits']} visits, {s['runs']} runs, {s['solved']} solved "
+                     f"({per_solve:.1f} runs per solve), median {median:.0f} s in the editor")
+        for error, count in s["errors"].most_common(3):
+            lines.append(f"    {count:4d} x {error}")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarise Hero of Codemere gameplay telemetry")
+    parser.add_argument("path", nargs="?", default=TELEMETRY_FILE, help="gzip JSONL or SQLite telemetry log")
+    args = parser.parse_args()
+    if not os.path.exists(args.path):
+        parser.error(f"no telemetry at {args.path}")
+    print(format_report(*summarize(load_events(args.path))))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+import time
+from collections import OrderedDict, deque
+
+import pygame
+
+# === Text layout for dialogue and challenge prompts
+# Authored text is a string or a list of paragraphs; each paragraph is word-
+# wrapped to a pixel width (keeping its leading indentation, so code samples
+# stay readable) and the lines are cut into pages that fit a box height.
+# Widths come from a per-font table of measured words (Font.size(), which
+# includes kerning that summed glyph advances miss), so wrapping never renders
+# text just to measure it and common words are measured once. Each finished
+# page is rendered once into a surface and cached per (text, font, width,
+# height, colour, line height).
+#
+# prepare() queues layouts ahead of time (the game queues an NPC's dialogue
+# and prompt while the player walks up to them) and pump() works through the
+# queue for a couple of milliseconds per frame, so opening or advancing a
+# dialogue is a cache hit instead of a layout pass.
+
+MAX_CACHED = 256  # laid-out texts kept before the least recently used is dropped
+
+
+class TextLayout:
+    def __init__(self, max_cached=MAX_CACHED):
+        self.max_cached = max_cached
+        self.widths = {}            # font -> {word: width in pixels}
+        self.cache = OrderedDict()  # layout key -> [page surfaces]
+        self.queue = deque()
+        self.queued = set()
+        self.layouts = 0            # layout passes run, for benchmarks
+
+    def text_width(self, font, text):
+        table = self.widths.setdefault(font, {})
+        width = table.get(text)
+        if width is None:
+            width = table[text] = font.size(text)[0]
+        return width
+
+    def wrap(self, font, paragraph, width):
+        indent = paragraph[:len(paragraph) - len(paragraph.lstrip(" "))]
+        indent_width = self.text_width(font, indent)
+        space = self.text_width(font, " ")
+        lines, line, line_width = [], indent, indent_width
+        for word in paragraph.split():
+            word_width = self.text_width(font, word)
+            if line.strip() and line_width + space + word_width > width:
+                lines.append(line)
+                line, line_width = indent, indent_width
+            if line.strip():
+                line, line_width = line + " ", line_width + space
+            if line_width + word_width <= width:
+                line, line_width = line + word, line_width + word_width
+                continue
+            # A word wider than the box is broken wherever it runs out of room
+            for ch in word:
+                if line.strip() and font.size(line + ch)[0] > width:
+                    lines.append(line)
+                    line = indent
+                line += ch
+            line_width = font.size(line)[0]
+        lines.append(line)
+        return lines
+
+    def pages(self, text, font, width, height, color=(255, 255, 255), line_height=None):
+        # Page surfaces for `text` laid out in a width x height box
+        paragraphs = (text,) if isinstance(text, str) else tuple(text)
+        line_height = line_height or font.get_linesize()
+        key = (paragraphs, font, width, height, color, line_height)
+        pages = self.cache.get(key)
+        if pages is not None:
+            self.cache.move_to_end(key)
+            return pages
+        self.layouts += 1
+        lines = [line for paragraph in paragraphs for line in self.wrap(font, paragraph, width)]
+        per_page = max(1, height // line_height)
+        pages = []
+        for start in range(0, len(lines), per_page):
+            chunk = lines[start:start + per_page]
+            page = pygame.Surface((width, len(chunk) * line_height), pygame.SRCALPHA)
+            for row, line in enumerate(chunk):
+                if line.strip():
+                    page.blit(font.render(line, True, color), (0, row * line_height))
+            pages.append(page)
+        self.cache[key] = pages
+        while len(self.cache) > self.max_cached:
+            self.cache.popitem(last=False)
+        return pages
+
+    def prepare(self, text, font, width, height, color=(255, 255, 255), line_height=None):
+        paragraphs = (text,) if isinstance(text, str) else tuple(text)
+        request = (paragraphs, font, width, height, color, line_height or font.get_linesize())
+        if request not in self.cache and request not in self.queued:
+            self.queue.append(request)
+            self.queued.add(request)
+
+    def pump(self, budget_ms=2.0):
+        # Lay out queued texts until the frame's budget is spent
+        deadline = time.perf_counter() + budget_ms / 1000
+        while self.queue and time.perf_counter() < deadline:
+            request = self.queue.popleft()
+            self.queued.discard(request)
+            self.pages(*request)
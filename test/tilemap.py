@@ -0,0 +1,90 @@
+import os
+import xml.etree.ElementTree as ET
+
+import numpy as np
+
+# === Tiled map helpers shared by the game and the offline tools
+
+
+def tileset_path(map_folder, ts):
+    return os.path.normpath(os.path.join(map_folder, ts["source"]))
+
+
+def parse_tileset(tsx_path):
+    root = ET.parse(tsx_path).getroot()
+    image = root.find("image")
+
+    collidable = set()
+    lights = {}
+    for tile in root.findall("tile"):
+        tile_id = int(tile.attrib["id"])
+        properties = tile.find("properties")
+        if properties:
+            for prop in properties.findall("property"):
+                if prop.attrib["name"].lower() == "collision" and prop.attrib["value"] == "true":
+                    collidable.add(tile_id)
+                elif prop.attrib["name"].lower() == "light":
+                    lights[tile_id] = float(prop.attrib["value"])
+
+    return {
+        "name": root.attrib.get("name", ""),
+        "columns": int(root.attrib["columns"]),
+        "tilecount": int(root.attrib.get("tilecount", 0)),
+        "image_path": os.path.normpath(os.path.join(os.path.dirname(tsx_path), image.attrib["source"])),
+        "collidable": collidable,  # local tile ids
+        "lights": lights,          # local tile id -> light radius in tiles
+    }
+
+
+def load_collidable_gids(map_data, map_folder):
+    collidable_gids = set()
+    for ts in map_data["tilesets"]:
+        info = parse_tileset(tileset_path(map_folder, ts))
+        collidable_gids.update(ts["firstgid"] + tile_id for tile_id in info["collidable"])
+    return collidable_gids
+
+
+def tile_layers(map_data):
+    return [layer for layer in map_data["layers"] if layer["type"] == "tilelayer"]
+
+
+def layer_grid(map_data, layer):
+    return np.asarray(layer["data"], dtype=np.int32).reshape(map_data["height"], map_data["width"])
+
+
+def build_collision_grid(map_data, collidable_gids):
+    # One bool per tile, True if any tile layer has a collidable gid there
+    max_gid = max(collidable_gids, default=0)
+    lookup = np.zeros(max_gid + 1, dtype=bool)
+    lookup[list(collidable_gids)] = True
+
+    grid = np.zeros((map_data["height"], map_data["width"]), dtype=bool)
+    for layer in tile_layers(map_data):
+        gids = layer_grid(map_data, layer)
+        grid |= lookup[np.where(gids <= max_gid, gids, 0)]
+    return grid
+
+
+def update_collision_region(grid, map_data, collidable_gids, x0, y0, x1, y1):
+    # Recompute collision for a rectangle of tiles; returns the cells that changed
+    width = map_data["width"]
+    changed = []
+    layers = tile_layers(map_data)
+    for y in range(y0, y1):
+        for x in range(x0, x1):
+            i = y * width + x
+            solid = any(layer["data"][i] in collidable_gids for layer in layers)
+            if grid[y, x] != solid:
+                grid[y, x] = solid
+                changed.append((x, y, solid))
+    return changed
+
+
+def used_tilesets(map_data):
+    # Indices into map_data["tilesets"] that at least one placed tile comes from
+    gids = np.unique(np.concatenate([np.asarray(layer["data"], dtype=np.int64) for layer in tile_layers(map_data)]))
+    gids = gids[gids > 0]
+    firstgids = np.array([ts["firstgid"] for ts in map_data["tilesets"]])
+    order = np.argsort(firstgids)
+    owners = order[np.searchsorted(firstgids[order], gids, side="right") - 1]
+    return set(owners.tolist())